@@ -0,0 +1,47 @@
+# bench_compare.py
+# Compare two bench_ui.py result files, e.g. from before and after a change:
+#   python3 bench/bench_compare.py before.jsonl after.jsonl
+
+import sys
+import json
+
+
+def load(path):
+    results = {}
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith('{'):
+                rec = json.loads(line)
+                if 'bench' in rec:
+                    results[rec['bench']] = rec
+    return results
+
+
+def change(old, new):
+    if old is None or new is None:
+        return '     -'
+    if not old:
+        return '     -' if not new else '   new'
+    return '{:+5.0f}%'.format((new - old) * 100 / old)
+
+
+def main(before, after):
+    a = load(before)
+    b = load(after)
+    print('{:<26} {:>10} {:>10} {:>6} {:>9} {:>6} {:>7} {:>6}'.format(
+        'bench', 'us before', 'us after', '', 'pixels', '', 'alloc', ''))
+    for name in list(a) + [n for n in b if n not in a]:
+        old = a.get(name, {})
+        new = b.get(name, {})
+        print('{:<26} {:>10} {:>10} {} {:>9} {} {:>7} {}'.format(
+            name, old.get('us', '-'), new.get('us', '-'), change(old.get('us'), new.get('us')),
+            str(new.get('pixels', '-')), change(old.get('pixels'), new.get('pixels')),
+            new.get('alloc', '-'), change(old.get('alloc'), new.get('alloc'))))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print('usage: bench_compare.py before.jsonl after.jsonl')
+        sys.exit(1)
+    main(sys.argv[1], sys.argv[2])
@@ -0,0 +1,115 @@
+# bench_display_init.py
+# Time the ST7701S init sent bit banged over the LCA9555: the original three
+# per-pin writes a bit against squixl.screen_init_spi_bitbanged(), which sends
+# port wide states in one I2C burst per command. Reports I2C transactions,
+# bytes on the bus, an estimate of bus time and the measured time less the
+# fixed delays in the init table.
+#
+# On the board:
+#   mpremote run bench/bench_display_init.py
+# On the host, where the fake expander also checks both send the same words:
+#   python3 sim/simulator.py bench/bench_display_init.py
+
+import time
+from time import ticks_ms, ticks_diff
+import squixl
+from squixl import (ioex, i2c, st7701s_init_commands, LCD_DELAY, LCA9555_ADDR,
+    SPI_MOSI, SPI_CLK, SPI_CS)
+from lca9555 import OUTPUT, HIGH, LOW
+
+
+def per_pin_init():
+    """The init as it was: CLK low, MOSI, CLK high as separate writes."""
+    ioex.pin_mode(SPI_MOSI, OUTPUT)
+    ioex.pin_mode(SPI_CLK, OUTPUT)
+    ioex.pin_mode(SPI_CS, OUTPUT)
+    ioex.write(SPI_CS, HIGH)
+    ioex.write(SPI_CLK, LOW)
+    ioex.write(SPI_MOSI, LOW)
+    cmds = st7701s_init_commands
+    i = 0
+    while True:
+        length = cmds[i]
+        i += 1
+        if length == 0:
+            break
+        if length == LCD_DELAY:
+            time.sleep_ms(cmds[i])
+            i += 1
+            continue
+        ioex.write(SPI_CS, LOW)
+        for k in range(length):
+            word = cmds[i] | 0x100 if k else cmds[i]
+            i += 1
+            for bit in range(8, -1, -1):
+                ioex.write(SPI_CLK, LOW)
+                ioex.write(SPI_MOSI, (word >> bit) & 1)
+                ioex.write(SPI_CLK, HIGH)
+        ioex.write(SPI_CS, HIGH)
+    time.sleep_ms(10)
+
+
+def fixed_delay_ms():
+    cmds = st7701s_init_commands
+    total = 10
+    i = 0
+    while cmds[i]:
+        if cmds[i] == LCD_DELAY:
+            total += cmds[i + 1]
+            i += 2
+        else:
+            i += cmds[i] + 1
+    return total
+
+
+def decode(levels):
+    """9 bit SPI words sampled on CLK rising edges, one list per CS frame."""
+    frames = []
+    words = None
+    word = bits = 0
+    last = 0xFF
+    for v in levels:
+        if not v & (1 << SPI_CS):
+            if words is None:
+                words = []
+                word = bits = 0
+            if v & (1 << SPI_CLK) and not last & (1 << SPI_CLK):
+                word = (word << 1) | ((v >> SPI_MOSI) & 1)
+                bits += 1
+                if bits == 9:
+                    words.append(word)
+                    word = bits = 0
+        elif words is not None:
+            frames.append(words)
+            words = None
+        last = v
+    return frames
+
+
+def measure(name, fn):
+    dev = getattr(i2c, 'devices', {}).get(LCA9555_ADDR)
+    log = getattr(dev, 'port0_log', None)
+    if log is not None:
+        log.clear()
+    t0 = getattr(i2c, 'transactions', None)
+    b0 = getattr(i2c, 'bytes', None)
+    start = ticks_ms()
+    fn()
+    ms = ticks_diff(ticks_ms(), start) - fixed_delay_ms()
+    line = '{:<10} {:>6} ms'.format(name, ms)
+    if t0 is not None:
+        n = i2c.transactions - t0
+        nbytes = i2c.bytes - b0
+        # start, address byte and stop per transaction, 9 clocks a byte
+        bus_ms = ((nbytes + n) * 9 + 2 * n) * 1000 // i2c.freq
+        line += '  {:>5} transactions  {:>6} bytes  ~{} ms on the bus at {} kHz'.format(
+            n, nbytes, bus_ms, i2c.freq // 1000)
+    print(line)
+    return decode(log) if log is not None else None
+
+
+print('ST7701S init, excluding {} ms of fixed delays'.format(fixed_delay_ms()))
+old = measure('per pin', per_pin_init)
+new = measure('burst', squixl.screen_init_spi_bitbanged)
+if old is not None:
+    print('same SPI frames sent:', old == new, '({} commands)'.format(len(new)))
@@ -0,0 +1,122 @@
+# bench_drv2605.py
+# I2C transactions and bytes the DRV2605 driver spends on the calls an app
+# makes: construction, mode / library / actuator changes, loading and reading
+# back sequence slots (one at a time, or held and flushed together), and
+# triggering. Each call is counted twice: through a driver with the register
+# shadow bypassed, which sends every access to the device as the driver did
+# before the shadow, and through the cached driver. The cached constructor
+# sends fewer transactions but more bytes: it reads the whole shadow in one
+# 33 byte burst. Host only: counts come from the simulator's fake I2C bus.
+#   python3 sim/simulator.py bench/bench_drv2605.py
+
+from machine import I2C, Pin
+from drv2605 import DRV2605, Effect, Pause, MODE_INTTRIG, MODE_REALTIME, LIBRARY_LRA
+
+i2c = I2C(0, scl=Pin.board.TP_SCL, sda=Pin.board.TP_SDA)
+# the fake DRV2605 as it comes up, so every constructor meets a fresh device
+device = I2C.devices[0x5A]
+power_on = bytes(device.regs)
+
+
+class Uncached(DRV2605):
+    # every register access is its own transaction; hold() and flush() have
+    # nothing to send
+
+    def _read_u8(self, register):
+        return self._i2c.readfrom_mem(self._addr, register, 1)[0]
+
+    def _write_u8(self, register, value):
+        self._i2c.writeto_mem(self._addr, register, bytes((value & 0xFF,)))
+
+    def invalidate(self):
+        pass
+
+
+drv = None
+
+
+def measure(fn, n):
+    t0 = i2c.transactions
+    b0 = i2c.bytes
+    for _ in range(n):
+        fn()
+    return (i2c.transactions - t0) / n, (i2c.bytes - b0) / n
+
+
+def count(name, fn, n=1):
+    # fn runs against drv, first the uncached driver then the cached one
+    global drv
+    drv = uncached
+    t0, b0 = measure(fn, n)
+    drv = cached
+    t1, b1 = measure(fn, n)
+    print('{:<24} {:>9.1f} {:>9.1f} {:>10.1f} {:>10.1f}'.format(name, t0, t1, b0, b1))
+
+
+def construct():
+    device.regs[:] = power_on
+    type(drv)(i2c)
+
+
+def set_mode():
+    drv.mode = MODE_REALTIME
+    drv.mode = MODE_INTTRIG
+
+
+def same_mode():
+    drv.mode = MODE_INTTRIG
+
+
+def read_settings():
+    return drv.mode, drv.library
+
+
+def actuator():
+    drv.use_LRM()
+    drv.use_ERM()
+
+
+sequences = ((Effect(47), Pause(0.1), Effect(47), Effect(0)),
+             (Effect(1), Pause(0.05), Effect(1), Effect(0)))
+flip = [0]
+
+
+def load_sequence():
+    # alternate between two sequences so every call changes three slots
+    flip[0] ^= 1
+    for i, effect in enumerate(sequences[flip[0]]):
+        drv.sequence[i] = effect
+
+
+def load_sequence_held():
+    drv.hold()
+    load_sequence()
+    drv.flush()
+
+
+def read_sequence():
+    return [drv.sequence[i] for i in range(4)]
+
+
+def set_library():
+    drv.library = LIBRARY_LRA
+
+
+def play():
+    drv.play()
+
+
+uncached = Uncached(i2c)
+cached = DRV2605(i2c)
+print('{:<24} {:>19} {:>21}'.format('', 'transactions', 'bytes'))
+print('{:<24} {:>9} {:>9} {:>10} {:>10}'.format('', 'uncached', 'cached', 'uncached', 'cached'))
+count('constructor', construct)
+count('mode change and back', set_mode, 10)
+count('mode set unchanged', same_mode, 10)
+count('read mode and library', read_settings, 10)
+count('library', set_library)
+count('use_LRM + use_ERM', actuator, 10)
+count('load 4 slots', load_sequence, 10)
+count('load 4 slots held', load_sequence_held, 10)
+count('read back 4 slots', read_sequence, 10)
+count('play', play, 10)
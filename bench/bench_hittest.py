@@ -0,0 +1,65 @@
+# bench_hittest.py
+# Micro-benchmark of UIManager touch dispatch: the per screen grid index
+# (process_touch) against the plain linear scan (process_touch_linear).
+# Copy to the board alongside lib/ and run, e.g. mpremote run bench/bench_hittest.py
+
+from time import ticks_us, ticks_diff
+from squixl_ui_EX import (UIManager, UIButton, UILabel, TouchEvent, TOUCH_TAP,
+    SCREEN_WIDTH, SCREEN_HEIGHT)
+
+COLS = 8
+ROWS = 8        # 64 buttons, plus one label per button
+TAPS = 2000
+
+
+def build_screen():
+    # no drawing happens during dispatch so no frame buffer or font is needed
+    mgr = UIManager(None, None)
+    mgr.add_screen('bench', 0)
+    w = SCREEN_WIDTH // COLS
+    h = SCREEN_HEIGHT // ROWS
+    for row in range(ROWS):
+        for col in range(COLS):
+            mgr.add_control('bench', UILabel(col * w, row * h, w, 0, 'lbl'))
+            mgr.add_control('bench', UIButton(col * w + 12, row * h + 12, w - 24, h - 24, 'b'))
+    return mgr
+
+
+def make_taps():
+    # deterministic spread of taps over the whole screen, hits and misses
+    taps = []
+    seed = 12345
+    for _ in range(TAPS):
+        seed = (seed * 1103515245 + 12345) & 0x7FFFFFFF
+        x = seed % SCREEN_WIDTH
+        seed = (seed * 1103515245 + 12345) & 0x7FFFFFFF
+        y = seed % SCREEN_HEIGHT
+        taps.append(TouchEvent(TOUCH_TAP, x, y))
+    return taps
+
+
+def time_dispatch(fn, taps):
+    hits = 0
+    t = ticks_us()
+    for evt in taps:
+        if fn(evt):
+            hits += 1
+    return ticks_diff(ticks_us(), t), hits
+
+
+def run():
+    mgr = build_screen()
+    taps = make_taps()
+    controls = len(mgr.screens['bench']['controls'])
+    lin_us, lin_hits = time_dispatch(mgr.process_touch_linear, taps)
+    grid_us, grid_hits = time_dispatch(mgr.process_touch, taps)
+    if lin_hits != grid_hits:
+        print('MISMATCH - linear hits', lin_hits, 'grid hits', grid_hits)
+    print('controls:', controls, 'taps:', len(taps), 'hits:', grid_hits)
+    print('linear scan: {:.1f} us/tap'.format(lin_us / len(taps)))
+    print('grid index : {:.1f} us/tap'.format(grid_us / len(taps)))
+    if grid_us:
+        print('speed up   : {:.1f}x'.format(lin_us / grid_us))
+
+
+run()
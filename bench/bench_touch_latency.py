@@ -0,0 +1,92 @@
+# bench_touch_latency.py
+# Touch to pixel latency of the touch pipeline and UIManager, replayed from a
+# touch trace (see lib/touch_trace.py). Without an argument a trace of a
+# button tap, a slider drag and a swipe is generated first and deleted when
+# the bench ends.
+#   mpremote run bench/bench_touch_latency.py            on the board
+#   python3 sim/simulator.py bench/bench_touch_latency.py [trace]
+
+import os
+import sys
+import asyncio
+import framebuf
+import squixl
+from writer import CWriter
+from colors import *
+from squixl_ui_EX import (UIManager, UILabel, UIButton, UISlider, WriterDevice,
+    TOUCH_TAP, TOUCH_DRAG, TOUCH_DRAG_END)
+from touch_trace import TraceWriter, replay
+
+try:
+    from fonts import robotomono_bold_18 as font18
+except ImportError:
+    from simfont import make_font
+    font18 = make_font(18, 11)
+
+TRACE = 'bench.trace'
+REPORT_MS = 10
+
+
+def make_trace(path):
+    w = TraceWriter(open(path, 'wb'))
+    t = 0
+
+    def touch(points):
+        nonlocal t
+        w.write(t, len(points), points)
+        t += REPORT_MS
+
+    # tap the button
+    for _ in range(6):
+        touch([(100, 420, 20)])
+    touch([])
+    t += 500
+    # drag the slider from 10 % to 90 %
+    for i in range(40):
+        touch([(64 + i * 9, 215, 20)])
+    touch([])
+    t += 500
+    # swipe left across the background
+    for i in range(12):
+        touch([(400 - i * 25, 320, 20)])
+    touch([])
+    w.close()
+
+
+def run():
+    path = sys.argv[1] if len(sys.argv) > 1 else None
+    if path is None:
+        path = TRACE
+        make_trace(path)
+        try:
+            bench(path)
+        finally:
+            os.remove(path)
+    else:
+        bench(path)
+
+
+def bench(path):
+    buf = squixl.create_display()
+    wbuf = WriterDevice(framebuf.FrameBuffer(buf, 480, 480, framebuf.RGB565))
+    font = CWriter(wbuf, font18, fgcolor=WHITE, verbose=False)
+    mgr = UIManager(wbuf, font)
+    mgr.add_screen('bench', GREY)
+    label = UILabel(20, 180, 0, 0, 'Level: 0')
+    mgr.add_control('bench', label)
+    mgr.add_control('bench', UISlider(20, 200, 440, 30, value=0,
+        callback=lambda v: label.set_text('Level: {}'.format(int(v))),
+        track_color=WHITE, knob_color=BLUE, bg_color=BLACK))
+    mgr.add_control('bench', UIButton(40, 400, 120, 40, 'Apply',
+        callback=lambda: label.set_text('Applied'), bg_color=LIGHTGREY))
+    mgr.set_screen('bench')
+    mgr.draw_all()
+
+    def on_gesture(evt):
+        if evt.type in (TOUCH_TAP, TOUCH_DRAG, TOUCH_DRAG_END):
+            mgr.post_touch(evt)
+
+    asyncio.run(replay(path, mgr, on_gesture, speed=0))
+
+
+run()
@@ -0,0 +1,223 @@
+# bench_ui.py
+# Render benchmarks for the UI layer: draw / set_text / set_value of every
+# widget class at typical sizes, text output paths, and draw_all of the demo
+# screens. One JSON object per line on stdout:
+#   {"bench": "UIButton.draw", "n": 50, "us": 812.4, "pixels": 5120, "alloc": 96}
+# us, pixels and alloc are per operation. pixels is only known on the host
+# simulator (null on the board); alloc is heap growth with the GC held off.
+#
+# On the board (fonts/ and lib/ copied across):
+#   mpremote run bench/bench_ui.py > before.jsonl
+# On the host:
+#   python3 sim/simulator.py bench/bench_ui.py > before.jsonl
+# Compare two runs with bench/bench_compare.py.
+
+import gc
+import sys
+import json
+import framebuf
+from time import ticks_us, ticks_diff
+import squixl
+from writer import CWriter
+from colors import *
+import squixl_ui_EX as ui
+from squixl_ui_EX import (UIManager, UILabel, UITextBox, UITextOnly, UIButton,
+    UISlider, UICheckBox, UIProgressBar, UIDial, WriterDevice, print_text,
+    rgb_to_565, ALIGNMENT_CENTER, ALIGNMENT_RIGHT)
+
+try:
+    from fonts import robotomono_light_16, robotomono_bold_18, robotomono_bold_22, robotomono_bold_24
+except ImportError:
+    # host run: stand-in fonts of the same sizes
+    from simfont import make_font
+    robotomono_light_16 = make_font(16, 10)
+    robotomono_bold_18 = make_font(18, 11)
+    robotomono_bold_22 = make_font(22, 13)
+    robotomono_bold_24 = make_font(24, 14)
+
+try:
+    import tracemalloc  # host only: lets gc.mem_alloc() see Python allocations
+    tracemalloc.start()
+except ImportError:
+    pass
+
+REPEAT = 20      # iterations per widget benchmark
+SCREEN_REPEAT = 5
+
+
+def pixels():
+    return getattr(framebuf, 'pixels_written', None)
+
+
+def bench(name, fn, n=REPEAT):
+    fn()  # warm up: first draw builds caches (glyph widths, dial geometry)
+    gc.collect()
+    gc.disable()
+    p0 = pixels()
+    a0 = gc.mem_alloc()
+    t0 = ticks_us()
+    for _ in range(n):
+        fn()
+    us = ticks_diff(ticks_us(), t0)
+    alloc = gc.mem_alloc() - a0
+    p1 = pixels()
+    gc.enable()
+    print(json.dumps({
+        'bench': name,
+        'n': n,
+        'us': round(us / n, 1),
+        'pixels': None if p0 is None else (p1 - p0) // n,
+        'alloc': max(0, alloc) // n,
+    }))
+
+
+def toggler(fn, a, b):
+    # alternate between two values so every call really changes something
+    state = [False]
+
+    def run():
+        state[0] = not state[0]
+        fn(a if state[0] else b)
+    return run
+
+
+def build_demo(mgr, fonts):
+    f18, f22, f24 = fonts
+    # the home and w_data screens of ui_example_asyncT.py
+    mgr.add_screen('home', GREY)
+    mgr.add_screen('w_data', LIGHTGREY)
+    x_pos = 20
+    for y, item in zip([40, 40, 100, 100], ['WiFi', 'Bluetooth', 'GPS', 'NFC']):
+        mgr.add_control('home', UICheckBox(x=x_pos, y=y, text=item, size=35, checked=True,
+            fg_color=rgb_to_565(220, 220, 220), bg_color=rgb_to_565(60, 60, 60),
+            check_color=rgb_to_565(100, 100, 100), label_color=rgb_to_565(220, 220, 220)))
+        x_pos = 160 if x_pos == 20 else 20
+    lbl = UILabel(20, 200, 0, 0, 'Brightness: 50', text_color=BLACK, bg_color=PINK)
+    lbl.font = f22
+    mgr.add_control('home', lbl)
+    for y in (220, 280):
+        mgr.add_control('home', UISlider(x=20, y=y, w=440, h=30, value=50,
+            track_color=rgb_to_565(180, 180, 180), knob_color=rgb_to_565(0, 120, 255),
+            bg_color=rgb_to_565(60, 60, 60)))
+    vol = UILabel(20, 260, 440, 0, 'Volume: 50')
+    vol.set_alignment(ALIGNMENT_RIGHT)
+    mgr.add_control('home', vol)
+    pb_lbl = UILabel(20, 320, 440, 0, 'Progress Bar', text_color=RED)
+    pb_lbl.set_alignment(ALIGNMENT_CENTER)
+    mgr.add_control('home', pb_lbl)
+    mgr.add_control('home', UIProgressBar(x=20, y=340, w=440, h=25, value=10,
+        track_color=rgb_to_565(200, 200, 200), fill_color=rgb_to_565(255, 100, 0),
+        bg_color=rgb_to_565(60, 60, 60)))
+    btn_x = 40
+    for text in ('Apply', 'Dials', 'Exit'):
+        btn = UIButton(btn_x, 400, 120, 40, text, fg_color=rgb_to_565(220, 220, 220),
+            bg_color=LIGHTGREY, text_color=RED)
+        btn.set_font(f18)
+        mgr.add_control('home', btn)
+        btn_x += 140
+    tb_lbl = UILabel(20, 150, 0, 0, text='Touch coordinates')
+    tb_lbl.set_font(f24)
+    mgr.add_control('home', tb_lbl)
+    tb = UITextBox(280, 150, 175, 26, text='Press Screen', fg_color=GREEN, bg_color=SQBLUE, text_color=PINK)
+    tb.set_font(f24)
+    tb.set_alignment(ALIGNMENT_CENTER)
+    mgr.add_control('home', tb)
+
+    mqtt_lbl = UILabel(20, 10, 440, 0, 'Awaiting mqtt msg', text_color=BLACK, bg_color=PINK)
+    mqtt_lbl.set_font(f22)
+    mqtt_lbl.align = ALIGNMENT_CENTER
+    mgr.add_control('w_data', mqtt_lbl)
+    box = UITextBox(x=200, y=87, w=100, h=30, fg_color=GREEN, bg_color=SQBLUE, text_color=PINK)
+    box.set_font(f24)
+    mgr.add_control('w_data', box)
+    compass = UIDial(250, 220, 80, smallticks=16, bigticks=4, face_color=BLUE, text_color=GREEN,
+        chr_list=('N', 'NE', 'E', 'SE', 'S', 'SW', ' W', 'NW'))
+    compass.font = f18
+    mgr.add_control('w_data', compass)
+    mgr.add_control('w_data', UIDial(100, 380, 60, smallticks=8, bigticks=0, face_color=DARKGREEN,
+        text_color=PINK, chr_list=('0', '10', '20', '30', '40', '50', ' 60', '70')))
+    go_home = UIButton(300, 400, 120, 40, 'Home', text_color=GREEN)
+    go_home.font = f18
+    mgr.add_control('w_data', go_home)
+
+
+def run():
+    buf = squixl.create_display()
+    wbuf = WriterDevice(framebuf.FrameBuffer(buf, 480, 480, framebuf.RGB565))
+    f16 = CWriter(wbuf, robotomono_light_16, fgcolor=WHITE, verbose=False)
+    f18 = CWriter(wbuf, robotomono_bold_18, fgcolor=WHITE, verbose=False)
+    f22 = CWriter(wbuf, robotomono_bold_22, fgcolor=WHITE, verbose=False)
+    f24 = CWriter(wbuf, robotomono_bold_24, fgcolor=WHITE, verbose=False)
+
+    impl = sys.implementation.name
+    print(json.dumps({'meta': {'implementation': impl, 'platform': sys.platform,
+        'text_cache': ui.text_cache is not None}}))
+
+    mgr = UIManager(wbuf, f16)
+    mgr.add_screen('bench', GREY)
+    label = UILabel(20, 10, 440, 0, 'Brightness: 50', text_color=PINK)
+    label.set_font(f22)
+    label.align = ALIGNMENT_CENTER
+    box = UITextBox(280, 60, 175, 26, text='240:120', fg_color=GREEN, bg_color=SQBLUE, text_color=PINK)
+    box.set_font(f24)
+    box.set_alignment(ALIGNMENT_CENTER)
+    only = UITextOnly(start_y=100)
+    button = UIButton(40, 140, 120, 40, 'Apply', fg_color=rgb_to_565(220, 220, 220),
+        bg_color=LIGHTGREY, text_color=RED)
+    button.set_font(f18)
+    slider = UISlider(x=20, y=200, w=440, h=30, value=50, track_color=rgb_to_565(180, 180, 180),
+        knob_color=rgb_to_565(0, 120, 255), bg_color=rgb_to_565(60, 60, 60))
+    check = UICheckBox(x=20, y=250, text='WiFi', size=35, checked=True)
+    bar = UIProgressBar(x=20, y=300, w=440, h=25, value=10)
+    dial = UIDial(360, 400, 70, smallticks=16, bigticks=4, face_color=BLUE, text_color=GREEN,
+        chr_list=('N', 'NE', 'E', 'SE', 'S', 'SW', ' W', 'NW'))
+    dial.font = f18
+    for ctrl in (label, box, only, button, slider, check, bar, dial):
+        mgr.add_control('bench', ctrl)
+    mgr.set_screen('bench')
+    mgr.draw_all()
+
+    # draw() of each widget on its own
+    for name, ctrl in (('UILabel', label), ('UITextBox', box), ('UIButton', button),
+                       ('UISlider', slider), ('UICheckBox', check), ('UIProgressBar', bar),
+                       ('UIDial', dial)):
+        bench(name + '.draw', ctrl.draw)
+
+    # state changes, including the repaint they cause
+    def redrawn(fn):
+        def run():
+            fn()
+            mgr.redraw()
+        return run
+
+    bench('UILabel.set_text', redrawn(toggler(label.set_text, 'Brightness: 51', 'Brightness: 50')))
+    bench('UITextBox.set_text', redrawn(toggler(box.set_text, '12:345', '240:120')))
+    bench('UITextOnly.set_text', redrawn(toggler(lambda t: only.set_text(t, f16, WHITE),
+        'Connecting to wifi', 'Connected')))
+    bench('UIButton.set_text', redrawn(toggler(button.set_text, 'Apply', 'Cancel')))
+    bench('UISlider.set_value', redrawn(toggler(slider.set_value, 20, 80)))
+    bench('UICheckBox.set_checked', redrawn(toggler(check.set_checked, False, True)))
+    bench('UIProgressBar.set_value', redrawn(toggler(bar.set_value, 25, 75)))
+    bench('UIDial.set_value', redrawn(toggler(dial.set_value, 30, 200)))
+
+    # text output paths
+    text = 'Brightness: 50'
+
+    def printstring():
+        CWriter.set_textpos(wbuf, 400, 20)
+        f22.setcolor(fgcolor=WHITE, bgcolor=GREY)
+        f22.printstring(text)
+
+    bench('CWriter.printstring', printstring)
+    if ui.text_cache is not None:
+        bench('print_text.cached', lambda: print_text(wbuf, f22, text, 20, 400, WHITE, GREY))
+
+    # whole screens
+    demo = UIManager(wbuf, f16)
+    build_demo(demo, (f18, f22, f24))
+    for name in ('home', 'w_data'):
+        demo.set_screen(name)
+        bench('draw_all.' + name, demo.draw_all, SCREEN_REPEAT)
+
+
+run()
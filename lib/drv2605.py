@@ -75,6 +75,14 @@ LIBRARY_TS2200D  = const(0x04)
 LIBRARY_TS2200E  = const(0x05)
 LIBRARY_LRA      = const(0x06)
 
+# Register shadow: the settings registers MODE (0x01) to 0x20 are cached.
+# STATUS, GO (self clearing), VBAT and LRARESON always go to the device.
+_CACHE_FIRST = const(0x01)
+_CACHE_LAST  = const(0x20)
+# Clean cached registers this short between dirty ones are rewritten rather
+# than starting another write
+_BRIDGE_GAP  = const(3)
+
 
 class DRV2605:
     """TI DRV2605 haptic feedback motor driver."""
@@ -87,7 +95,13 @@ class DRV2605:
         device_id = (status >> 5) & 0x07
         if device_id not in (3, 7):
             raise RuntimeError("Failed to find DRV2605, check wiring!")
-        # Initialize registers
+        # Shadow of registers 0x01-0x20, filled with one burst read
+        self._shadow = bytearray(_CACHE_LAST + 1)
+        self._dirty = bytearray(_CACHE_LAST + 1)
+        self._held = False
+        self.invalidate()
+        # Initialize registers, sent together by flush()
+        self.hold()
         self._write_u8(_DRV2605_REG_MODE, 0x00)
         self._write_u8(_DRV2605_REG_RTPIN, 0x00)
         self._write_u8(_DRV2605_REG_WAVESEQ1, 1)
@@ -104,15 +118,62 @@ class DRV2605:
         # Default settings
         self.mode = MODE_INTTRIG
         self.library = LIBRARY_TS2200A
+        self.flush()
         self._sequence = _DRV2605_Sequence(self)
 
     def _read_u8(self, register: int) -> int:
-        """Read a single byte from a register."""
+        """Read a single byte from a register, from the shadow if cached."""
+        if _CACHE_FIRST <= register <= _CACHE_LAST and register != _DRV2605_REG_GO:
+            return self._shadow[register]
         return self._i2c.readfrom_mem(self._addr, register, 1)[0]
 
     def _write_u8(self, register: int, value: int) -> None:
-        """Write a single byte to a register."""
-        self._i2c.writeto_mem(self._addr, register, bytes((value & 0xFF,)))
+        """Write a single byte to a register. Cached registers are skipped
+        when unchanged, and held back for flush() after hold()."""
+        value &= 0xFF
+        if not _CACHE_FIRST <= register <= _CACHE_LAST or register == _DRV2605_REG_GO:
+            self._i2c.writeto_mem(self._addr, register, bytes((value,)))
+            return
+        if self._shadow[register] == value and not self._dirty[register]:
+            return
+        self._shadow[register] = value
+        self._dirty[register] = 1
+        if not self._held:
+            self.flush()
+
+    def hold(self) -> None:
+        """Keep register writes in the shadow until flush()."""
+        self._held = True
+
+    def flush(self) -> None:
+        """Write the changed registers, one burst per run of them, and stop
+        holding writes back."""
+        self._held = False
+        dirty = self._dirty
+        reg = _CACHE_FIRST
+        while reg <= _CACHE_LAST:
+            if not dirty[reg]:
+                reg += 1
+                continue
+            start = end = reg
+            reg += 1
+            # GO is never part of a burst: rewriting it would retrigger
+            while reg <= _CACHE_LAST and reg - end <= _BRIDGE_GAP and reg != _DRV2605_REG_GO:
+                if dirty[reg]:
+                    end = reg
+                reg += 1
+            self._i2c.writeto_mem(self._addr, start, memoryview(self._shadow)[start:end + 1])
+            for r in range(start, end + 1):
+                dirty[r] = 0
+            reg = end + 1
+
+    def invalidate(self) -> None:
+        """Reload the shadow from the device, e.g. after auto calibration
+        has written its results. Unflushed writes are lost."""
+        self._i2c.readfrom_mem_into(self._addr, _CACHE_FIRST,
+                                    memoryview(self._shadow)[_CACHE_FIRST:])
+        for r in range(len(self._dirty)):
+            self._dirty[r] = 0
 
     def play(self) -> None:
         """Play the currently configured waveform sequence."""
@@ -122,6 +183,26 @@ class DRV2605:
         """Stop any playback."""
         self._write_u8(_DRV2605_REG_GO, 0)
 
+    def play_sequence(self, slots) -> None:
+        """Load all 8 waveform slots with raw values (effect id, or pause with
+        bit 7 set; unused slots end the sequence) and set GO, in one burst
+        write of registers WAVESEQ1-8 and GO."""
+        if len(slots) > 8:
+            raise ValueError("At most 8 slots!")
+        buf = bytearray(9)
+        for i, value in enumerate(slots):
+            buf[i] = value
+        buf[8] = 1
+        self._i2c.writeto_mem(self._addr, _DRV2605_REG_WAVESEQ1, buf)
+        for i in range(8):
+            self._shadow[_DRV2605_REG_WAVESEQ1 + i] = buf[i]
+            self._dirty[_DRV2605_REG_WAVESEQ1 + i] = 0
+
+    @property
+    def playing(self) -> bool:
+        """True until the GO bit clears at the end of the sequence."""
+        return bool(self._read_u8(_DRV2605_REG_GO) & 1)
+
     @property
     def mode(self) -> int:
         """Get or set the trigger mode (0–7)."""
@@ -6,12 +6,10 @@
 
 # Import required libraries
 from micropython import const
-from machine import Pin, I2C, PWM, RGB, I2S
-from max17048 import MAX17048
+from machine import Pin, I2C, PWM, RGB, I2S, RTC
 from lca9555 import LCA9555, OUTPUT, HIGH, LOW, INPUT
-from drv2605 import DRV2605, Effect, Pause, MODE_INTTRIG
-from gt911 import GT911
-import time, sys
+import machine, time, sys
+import squixl_profile as profile
 
 
 # S3 IO
@@ -119,68 +117,226 @@ audio_out = None
 # back_light = PWM(BL_PWM, freq=6000, duty_u16=8192)
 # back_light.duty_u16(32768)
 
-# Initialize I2C bus
-i2c = I2C(0, scl=Pin.board.TP_SCL, sda=Pin.board.TP_SDA)
-
-# Create an instance of the MAX17048 class
-max17048 = MAX17048(i2c)
+# Hardware is brought up on first use, or in phases by init(). The drivers
+# are reached as squixl.i2c, squixl.ioex, squixl.touch, squixl.drv and
+# squixl.max17048, or through the get_*() functions below. Tasks sharing the
+# bus once asyncio is running lease it from squixl.bus (see squixl_bus.py).
+_i2c = None
+_ioex = None
+_touch = None
+_drv = None
+_max17048 = None
+_bus = None
+_haptics = None
+_iomux = None
+
+# Written to the start of RTC memory once the panel is configured, so a soft
+# reset can skip the ST7701S init sequence. Those bytes are reserved; keep
+# application data after them, e.g. with rtc_memory()
+PANEL_READY = b'ST7701S'
+RTC_RESERVED = len(PANEL_READY)
 
-# Create instance of tehe LCA9555 IO Expander
-ioex = LCA9555(i2c)
+# Initialize I2C bus
+def get_i2c():
+    global _i2c
+    if _i2c is None:
+        _i2c = I2C(0, scl=Pin.board.TP_SCL, sda=Pin.board.TP_SDA)
+    return _i2c
 
-# LCD Reset 
-ioex.pin_mode(LCD_RST, OUTPUT, HIGH)
+# Create instance of the LCA9555 IO Expander and set up the board pins
+def get_ioex():
+    global _ioex
+    if _ioex is None:
+        _ioex = LCA9555(get_i2c())
 
-# Screen backlight EN
-ioex.pin_mode(BL_EN, OUTPUT, HIGH)
+        # LCD Reset 
+        _ioex.pin_mode(LCD_RST, OUTPUT, HIGH)
 
-# Screen soft power EN
-ioex.pin_mode(SOFT_PWR, OUTPUT, LOW)
+        # Screen backlight EN
+        _ioex.pin_mode(BL_EN, OUTPUT, HIGH)
 
-# 5V presense sense IO
-ioex.pin_mode(VBUS_SENSE, INPUT)
+        # Screen soft power EN
+        _ioex.pin_mode(SOFT_PWR, OUTPUT, LOW)
 
-# IO MUX - EN is Active LOW, so start it off
-ioex.pin_mode(MUX_EN, OUTPUT, HIGH)
+        # 5V presense sense IO
+        _ioex.pin_mode(VBUS_SENSE, INPUT)
 
-# IO MUX - Set default to I2S - LOW is SD
-ioex.pin_mode(MUX_SEL, OUTPUT, HIGH)
+        # IO MUX - EN is Active LOW, so start it off
+        _ioex.pin_mode(MUX_EN, OUTPUT, HIGH)
 
-# Haptic EN
-ioex.pin_mode(HAPTICS_EN, OUTPUT, HIGH)
+        # IO MUX - Set default to I2S - LOW is SD
+        _ioex.pin_mode(MUX_SEL, OUTPUT, HIGH)
+    return _ioex
 
 # Initialise the GT911 touch IC 
-touch = GT911(i2c, irq_pin=3, reset_pin=5, ioex=ioex)
+def get_touch():
+    global _touch
+    if _touch is None:
+        from gt911 import GT911
+        _touch = GT911(get_i2c(), irq_pin=3, reset_pin=TP_RST, ioex=get_ioex())
+    return _touch
 
 # Initialise the DRV2605 haptic engine
-drv = DRV2605(i2c)
+def get_drv():
+    global _drv
+    if _drv is None:
+        from drv2605 import DRV2605, Effect
+        # Haptic EN
+        get_ioex().pin_mode(HAPTICS_EN, OUTPUT, HIGH)
+        _drv = DRV2605(get_i2c())
+        # Set the driver to a basic click effect
+        _drv.sequence[0] = Effect(1)
+    return _drv
 
-# Set the driver to a basic click effect
-drv.sequence[0] = Effect(1)
+# Create an instance of the MAX17048 class
+def get_battery():
+    global _max17048
+    if _max17048 is None:
+        from max17048 import MAX17048
+        _max17048 = MAX17048(get_i2c())
+    return _max17048
+
+# Arbiter for asyncio tasks sharing the I2C bus
+def get_bus():
+    global _bus
+    if _bus is None:
+        from squixl_bus import I2CBus, PORT_PAIRS
+        _bus = I2CBus(get_i2c())
+        # queued expander writes merge per output port pair
+        _bus.declare(LCA9555_ADDR, PORT_PAIRS)
+    return _bus
+
+# Queued, non-blocking haptic effects; start its run() task before use
+def get_haptics():
+    global _haptics
+    if _haptics is None:
+        from squixl_haptics import HapticService
+        _haptics = HapticService(get_drv(), get_bus())
+    return _haptics
+
+# Arbiter leasing the IOMUX to SD and I2S users
+def get_iomux():
+    global _iomux
+    if _iomux is None:
+        from squixl_iomux import IOMux
+        _iomux = IOMux()
+    return _iomux
+
+_lazy = {
+    'bus': get_bus,
+    'iomux': get_iomux,
+    'haptics': get_haptics,
+    'i2c': get_i2c,
+    'ioex': get_ioex,
+    'touch': get_touch,
+    'drv': get_drv,
+    'max17048': get_battery,
+}
+
+def __getattr__(name):
+    if name in _lazy:
+        return _lazy[name]()
+    raise AttributeError(name)
+
+# Configure the panel, unless it still is from before a soft reset
+def screen_init(force=False):
+    """Run the ST7701S init sequence. Returns False when it was skipped
+    because the panel kept its configuration through a soft reset. The
+    marker takes the first RTC_RESERVED bytes of RTC memory; the rest is
+    left as it was."""
+    rtc = RTC()
+    mem = rtc.memory()
+    if not force and machine.reset_cause() == machine.SOFT_RESET and mem[:RTC_RESERVED] == PANEL_READY:
+        get_ioex()
+        return False
+    # only the reserved bytes change, the application's data is kept
+    rest = mem[RTC_RESERVED:]
+    rtc.memory(bytes(RTC_RESERVED) + rest)
+    screen_init_spi_bitbanged()
+    rtc.memory(PANEL_READY + rest)
+    return True
+
+# Read or write the application's part of RTC memory, after the bytes
+# screen_init() reserves
+def rtc_memory(data=None):
+    rtc = RTC()
+    mem = rtc.memory()
+    if data is None:
+        return mem[RTC_RESERVED:]
+    head = mem[:RTC_RESERVED]
+    rtc.memory(head + bytes(RTC_RESERVED - len(head)) + bytes(data))
+
+# Bring up the hardware an app needs, in phases, and report the time each took
+def init(display=True, touch=True, haptics=False, battery=False):
+    """Initialise the chosen subsystems; the rest wait for first use.
+    Returns a dict of phase name to milliseconds."""
+    phases = [('bus', get_ioex)]
+    if display:
+        phases.append(('display', screen_init))
+    if touch:
+        phases.append(('touch', get_touch))
+    if haptics:
+        phases.append(('haptics', get_drv))
+    if battery:
+        phases.append(('battery', get_battery))
+    times = {}
+    for name, fn in phases:
+        t0 = time.ticks_ms()
+        result = fn()
+        ms = time.ticks_diff(time.ticks_ms(), t0)
+        times[name] = ms
+        if result is False:
+            name += ' (warm)'
+        profile.mark('init ' + name)
+        print("SQUiXL init {}: {} ms".format(name, ms))
+    return times
 
 # SPI initialisation of the screen is bit banged as the IO is via the IOExpander 
+# LCA9555 registers used for port wide writes
+LCA9555_ADDR = const(0x20)
+LCA9555_OUTPUT0 = const(0x02)
+
+# Expander pins of the panel SPI, all on port 0
+SPI_MOSI = 2
+SPI_CLK = 3
+SPI_CS = 4
+
 def screen_init_spi_bitbanged():
     """
     Bit-banged SPI over LCA9555 pins to send init commands to ST7701S display.
-    ioex: instance of LCA9555
+    Whole port 0 states are worked out from a shadow of the output registers
+    and each command goes out as a single I2C burst: the LCA9555 latches
+    every data byte, alternating between the output port 0/1 pair, so a clock
+    edge costs two bytes (port 1 is rewritten with its current value).
     """
-    # Expander pins (0-15)
-    MOSI = 2  # expander P2
-    CLK  = 3  # expander P3
-    CS   = 4  # expander P4
+    ioex = get_ioex()
+    i2c = get_i2c()
 
     # Configure pins as outputs
-    ioex.pin_mode(MOSI, OUTPUT)
-    ioex.pin_mode(CLK, OUTPUT)
-    ioex.pin_mode(CS, OUTPUT)
+    ioex.pin_mode(SPI_MOSI, OUTPUT)
+    ioex.pin_mode(SPI_CLK, OUTPUT)
+    ioex.pin_mode(SPI_CS, OUTPUT)
 
     # Idle states
-    ioex.write(CS, HIGH)
-    ioex.write(CLK, LOW)
-    ioex.write(MOSI, LOW)
+    ioex.write(SPI_CS, HIGH)
+    ioex.write(SPI_CLK, LOW)
+    ioex.write(SPI_MOSI, LOW)
+
+    # Shadow of both output ports, so the other pins keep their levels
+    port0, port1 = i2c.readfrom_mem(LCA9555_ADDR, LCA9555_OUTPUT0, 2)
+    mosi = 1 << SPI_MOSI
+    clk = 1 << SPI_CLK
+    idle = (port0 | (1 << SPI_CS)) & ~(clk | mosi)
+    low = idle & ~(1 << SPI_CS)
 
     cmds = st7701s_init_commands
 
+    # Longest command: 17 bytes of 9 bits, two edges a bit, plus CS edges
+    burst = bytearray(1 + 2 * (17 * 18 + 3))
+    burst[0] = LCA9555_OUTPUT0
+    for n in range(2, len(burst), 2):
+        burst[n] = port1
+
     i = 0
     while True:
         length = cmds[i]
@@ -192,43 +348,39 @@ def screen_init_spi_bitbanged():
             i += 1
             time.sleep_ms(delay_ms)
             continue
-        # Next byte is command
-        cmd = cmds[i]
-        i += 1
         # CS low to start transaction
-        ioex.write(CS, LOW)
-        # DC bit = 0 for command
-        ioex.write(CLK, LOW)
-        ioex.write(MOSI, 0)
-        ioex.write(CLK, HIGH)
-        # Send 8-bit command
-        for bit in range(7, -1, -1):
-            ioex.write(CLK, LOW)
-            ioex.write(MOSI, (cmd >> bit) & 1)
-            ioex.write(CLK, HIGH)
-        # Send data bytes (length-1)
-        for _ in range(length - 1):
-            data_byte = cmds[i]
+        burst[1] = low
+        n = 3
+        # Command with DC bit = 0, then data bytes (length-1) with DC bit = 1
+        for k in range(length):
+            word = cmds[i] | 0x100 if k else cmds[i]
             i += 1
-            # DC bit = 1 for data
-            ioex.write(CLK, LOW)
-            ioex.write(MOSI, 1)
-            ioex.write(CLK, HIGH)
-            # Send 8 bits of data
-            for bit in range(7, -1, -1):
-                ioex.write(CLK, LOW)
-                ioex.write(MOSI, (data_byte >> bit) & 1)
-                ioex.write(CLK, HIGH)
-        # CS high to end transaction
-        ioex.write(CS, HIGH)
-        # small pause (optional)
-        # time.sleep_us(10)
+            for bit in range(8, -1, -1):
+                # Set MOSI with CLK low, the panel samples on CLK high
+                state = low | mosi if (word >> bit) & 1 else low
+                burst[n] = state
+                burst[n + 2] = state | clk
+                n += 4
+        # CLK low, then CS high to end transaction
+        burst[n] = low
+        burst[n + 2] = idle
+        n += 4
+        i2c.writeto(LCA9555_ADDR, memoryview(burst)[:n - 1])
     time.sleep_ms(10)
 
 # Function to create the display
-def create_display():
+# With double_buffer=True two frame buffers are allocated in PSRAM and a tuple
+# of both is returned; draw into the one not being shown and call
+# show_buffer() to flip. This needs RGB firmware support for get_buffer(index)
+# and show(index); without it the tuple is (buffer, None) and the display is
+# single buffered.
+def create_display(double_buffer=False):
     global lcd
     
+    flip = double_buffer and hasattr(RGB, 'show')
+    if double_buffer and not flip:
+        print("RGB firmware can't flip pages, using a single buffer")
+
     lcd = RGB(
         480, 480, RGB_IO,
         hsync             = HSYNC,
@@ -236,7 +388,7 @@ def create_display():
         de                = DE,
         pclk              = PCLK,
         freq              = 6_000_000,  # 6 MHz
-        num_fbs           = 1,           # double-buffering
+        num_fbs           = 2 if flip else 1,  # double-buffering
         psram_trans_align = 64,
         sram_trans_align  = 8,
         bits_per_pixel    = 16,
@@ -254,9 +406,17 @@ def create_display():
         bounce_buffer_size_px = 10 * 480,
     )
 
-    # Return the display buffer
+    # Return the display buffer(s)
+    if flip:
+        return lcd.get_buffer(0), lcd.get_buffer(1)
+    if double_buffer:
+        return lcd.get_buffer(), None
     return lcd.get_buffer()
 
+# Scan out frame buffer index (0 or 1) of a double buffered display
+def show_buffer(index):
+    lcd.show(index)
+
 # CHnage teh state of the IOMUX from Off, to I2S or uSD
 def set_iomux(state=IOMUX_OFF):
     """Set the state of the IOMUX - for I2S Amp or SD Card or OFF"""
@@ -270,6 +430,7 @@ def set_iomux(state=IOMUX_OFF):
         audio_out.deinit()
     
     # IO MUX - Set default to I2S - LOW is SD
+    ioex = get_ioex()
 
     if state == IOMUX_OFF:
         ioex.write(MUX_EN, HIGH)
@@ -285,41 +446,88 @@ def set_iomux(state=IOMUX_OFF):
         sd_mode = Pin(IOMUX_D1, Pin.OUT)
         sd_mode.value(1)
 
-        audio_out = I2S(
-            1,
-            sck=Pin(IOMUX_D4),
-            ws=Pin(IOMUX_D2),
-            sd=Pin(IOMUX_D3),
-            mode=I2S.TX,
-            bits=SAMPLE_SIZE_IN_BITS,
-            format=FORMAT,
-            rate=SAMPLE_RATE_IN_HZ,
-            ibuf=I2S_BUFFER_LENGTH_IN_BYTES,
-        )
+        # back in the format last asked for, so open_audio() need not rebuild
+        if audio_format is None:
+            _create_audio(SAMPLE_RATE_IN_HZ, SAMPLE_SIZE_IN_BITS, FORMAT)
+        else:
+            _create_audio(*audio_format)
         print("SQUiXL IOMUX is I2S")
 
     current_iomux_state = state
+
+# Format the I2S amp is running at, (rate, bits, format, ibuf)
+audio_format = None
+
+def _create_audio(rate, bits, format, ibuf=I2S_BUFFER_LENGTH_IN_BYTES):
+    global audio_out, audio_format
+    audio_out = I2S(
+        1,
+        sck=Pin(IOMUX_D4),
+        ws=Pin(IOMUX_D2),
+        sd=Pin(IOMUX_D3),
+        mode=I2S.TX,
+        bits=bits,
+        format=format,
+        rate=rate,
+        ibuf=ibuf,
+    )
+    audio_format = (rate, bits, format, ibuf)
+
+# I2S amp at a given sample format, switching the IOMUX to I2S if needed
+def open_audio(rate=SAMPLE_RATE_IN_HZ, bits=SAMPLE_SIZE_IN_BITS, format=FORMAT,
+               ibuf=I2S_BUFFER_LENGTH_IN_BYTES):
+    """Return the I2S object, rebuilt if the format or ibuf changed"""
+    set_iomux(IOMUX_I2S)
+    if audio_format != (rate, bits, format, ibuf):
+        audio_out.deinit()
+        _create_audio(rate, bits, format, ibuf)
+    return audio_out
         
 # General Helper Functions
 
 # Battery voltage
 def get_bat_voltage():
     """Read the battery voltage from the fuel gauge"""
-    voltage = max17048.cell_voltage
+    voltage = get_battery().cell_voltage
     print(f"Bat Voltage: {voltage}V")
     return voltage
 
 # Battery charge state
 def get_state_of_charge():
     """Read the battery state of charge from the fuel gauge"""
-    soc = max17048.state_of_charge
+    soc = get_battery().state_of_charge
     print(f"State of Charge: {soc}%")
     return soc
 
+# Battery voltage and state of charge from an asyncio task, at the lowest
+# bus priority so touch reads go first
+async def read_battery():
+    """(voltage, state of charge %) read under a battery lease of the bus"""
+    from squixl_bus import PRIO_BATTERY
+    gauge = get_battery()
+    async with get_bus().lease(PRIO_BATTERY):
+        voltage = gauge.cell_voltage
+    async with get_bus().lease(PRIO_BATTERY):
+        soc = gauge.state_of_charge
+    return voltage, soc
+
 # 5V Presense
 def get_vbus_present():
     """Detect if VBUS (5V) power source is present"""
-    return ioex.read(VBUS_SENSE) == 1
+    return get_ioex().read(VBUS_SENSE) == 1
+
+# Expander pins from an asyncio task, under an expander lease of the bus
+async def write_expander(pin, value):
+    """Set an expander output pin once the bus is free for it"""
+    from squixl_bus import PRIO_EXPANDER
+    async with get_bus().lease(PRIO_EXPANDER):
+        get_ioex().write(pin, value)
+
+async def read_vbus_present():
+    """get_vbus_present() under an expander lease of the bus"""
+    from squixl_bus import PRIO_EXPANDER
+    async with get_bus().lease(PRIO_EXPANDER):
+        return get_ioex().read(VBUS_SENSE) == 1
 
 # --- Context Manager Support ---
 
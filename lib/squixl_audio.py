@@ -0,0 +1,212 @@
+# squixl_audio.py
+# Streams WAV or raw PCM to the I2S amp behind the IOMUX from an asyncio
+# task, so a sound never holds up touch handling or MQTT.
+#
+#   player = AudioPlayer()
+#   player.play('/sounds/click.wav')         # returns at once
+#   player.set_volume(5)                     # 0 (mute) .. VOLUME_MAX
+#   await player.wait()                      # optional: until it has played
+#   player.stop()
+#
+# The I2S object runs in non-blocking mode: write() hands a buffer to the
+# driver and returns, and the driver's irq says when it has been copied into
+# the driver's ibuf, which still has to play out. While one of two
+# preallocated buffers is being sent the next chunk is read into the other,
+# so the file read overlaps playback.
+# The SD card shares pins with the amp through the IOMUX. Given the IOMux
+# arbiter (squixl.iomux) the player holds an I2S lease while it plays and,
+# when an SD request has waited, lets the ibuf drain and gives the pins up
+# at a chunk boundary. Read sounds that live on SD into memory with
+# mux.load() (or load() while the IOMUX is on SD) and play those.
+
+import io
+import struct
+import asyncio
+from machine import I2S
+import squixl
+from squixl import IOMUX_I2S
+
+CHUNK = 2048            # bytes per buffer, 46 ms of 22 kHz 16 bit mono
+VOLUME_MAX = 8          # full scale; each step down halves the amplitude
+IBUF = 8192             # I2S driver buffer while the player owns the amp
+
+
+def parse_wav(f):
+    """Read a RIFF/WAVE header from f. Returns (rate, bits, channels, data
+    bytes) with f positioned at the first sample."""
+    riff = f.read(12)
+    if len(riff) < 12 or riff[:4] != b'RIFF' or riff[8:12] != b'WAVE':
+        raise ValueError('not a WAV file')
+    fmt = None
+    while True:
+        head = f.read(8)
+        if len(head) < 8:
+            raise ValueError('WAV file has no data')
+        tag = head[:4]
+        size = struct.unpack('<I', head[4:])[0]
+        if tag == b'fmt ':
+            body = f.read(size)
+            audio, channels, rate, _, _, bits = struct.unpack('<HHIIHH', body[:16])
+            if audio != 1:
+                raise ValueError('WAV is not PCM')
+            fmt = (rate, bits, channels)
+        elif tag == b'data':
+            if fmt is None:
+                raise ValueError('WAV data before fmt')
+            return fmt + (size,)
+        else:
+            f.seek(size + (size & 1), 1)
+        if tag == b'fmt ' and size & 1:
+            f.read(1)
+
+
+def load(path):
+    """A sound file in memory, ready to play while the IOMUX is on I2S."""
+    with open(path, 'rb') as f:
+        return io.BytesIO(f.read())
+
+
+class AudioPlayer:
+    """One sound at a time on the SQUiXL amp. play() starts a new sound,
+    stopping the one playing."""
+
+    def __init__(self, chunk=CHUNK, ibuf=IBUF, mux=None):
+        self.ibuf = ibuf
+        self.mux = mux
+        self._bufs = (bytearray(chunk), bytearray(chunk))
+        self._mvs = (memoryview(self._bufs[0]), memoryview(self._bufs[1]))
+        self._silence = memoryview(bytearray(chunk))
+        self._carry = bytearray(8)  # partial frame between buffers
+        self._sent = asyncio.ThreadSafeFlag()
+        self._done = asyncio.Event()
+        self._done.set()
+        self._task = None
+        self._gen = 0           # which play() the running task belongs to
+        self.volume = VOLUME_MAX
+        self.playing = False
+        self.chunks = 0         # buffers handed to the driver
+
+    def set_volume(self, level):
+        self.volume = max(0, min(VOLUME_MAX, level))
+
+    def play(self, source, loop=False, rate=None, bits=16, channels=1):
+        """Play a path, open file or BytesIO. WAV headers are read; give rate
+        (and bits, channels) for raw PCM."""
+        self.stop()
+        self._done.clear()
+        self.playing = True
+        self._gen += 1
+        self._task = asyncio.create_task(self._run(source, loop, rate, bits, channels, self._gen))
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self.playing = False
+        self._done.set()
+
+    async def wait(self):
+        await self._done.wait()
+
+    def _irq(self, i2s):
+        self._sent.set()
+
+    async def _run(self, source, loop, rate, bits, channels, gen):
+        f = open(source, 'rb') if isinstance(source, str) else source
+        i2s = None
+        held = [False]      # holding an I2S lease of the mux
+        try:
+            start = f.tell()
+            if rate is None:
+                rate, bits, channels, size = parse_wav(f)
+                start = f.tell()
+            else:
+                size = None
+            if bits not in (16, 32) or channels not in (1, 2):
+                raise ValueError('unsupported format: {} bit, {} channels'.format(bits, channels))
+            fmt = (rate, bits, I2S.MONO if channels == 1 else I2S.STEREO, self.ibuf)
+            if self.mux is not None:
+                await self.mux.acquire(IOMUX_I2S)
+                held[0] = True
+            i2s = squixl.open_audio(*fmt)
+            i2s.irq(self._irq)
+            await self._stream(f, i2s, start, size, loop, bits, channels, fmt, held)
+        finally:
+            if isinstance(source, str):
+                f.close()
+            if held[0]:
+                self.mux.release()
+            # a cancelled task must not undo the play() that replaced it
+            if gen == self._gen:
+                if i2s is not None:
+                    i2s.irq(None)
+                self.playing = False
+                self._done.set()
+
+    async def _stream(self, f, i2s, start, size, loop, bits, channels, fmt, held):
+        mvs = self._mvs
+        sent = self._sent
+        carry = self._carry
+        frame = bits // 8 * channels
+        # time for a full ibuf to play out after its last write was taken
+        drain_ms = self.ibuf * 1000 // (fmt[0] * frame) + 1
+        left = size
+        i = 0
+        c = 0       # bytes of a partial frame carried into the next buffer
+        busy = False
+        pos = 0     # bytes since start, to stop an empty loop spinning
+        sent.clear()    # a buffer of a stopped sound may have finished since
+        while True:
+            mv = mvs[i]
+            if c:
+                mv[:c] = carry[:c]
+            room = len(mv) - c
+            if left is not None and left < room:
+                room = left
+            n = f.readinto(mv[c:c + room])
+            if not n:
+                # a partial frame at the end of the data is dropped
+                c = 0
+                if not loop or not pos:
+                    break
+                f.seek(start)
+                left = size
+                pos = 0
+                continue
+            if left is not None:
+                left -= n
+            n += c
+            c = n % frame
+            n -= c
+            if c:
+                carry[:c] = mv[n:n + c]
+            if not n:
+                continue
+            pos += n
+            if self.volume < VOLUME_MAX:
+                if self.volume:
+                    I2S.shift(buf=mv[:n], bits=bits, shift=self.volume - VOLUME_MAX)
+                else:
+                    mv[:n] = self._silence[:n]
+            if busy:
+                # the other buffer is still with the driver
+                await sent.wait()
+                mux = self.mux
+                if mux is not None and mux.contended(IOMUX_I2S):
+                    # SD has waited long enough: let what the driver holds
+                    # play out, hand the pins over between chunks and carry
+                    # on once they are back
+                    await asyncio.sleep_ms(drain_ms)
+                    held[0] = False
+                    await mux.yield_lease(IOMUX_I2S)
+                    held[0] = True
+                    i2s = squixl.open_audio(*fmt)
+                    i2s.irq(self._irq)
+                    sent.clear()
+            i2s.write(mv[:n])
+            self.chunks += 1
+            busy = True
+            i ^= 1
+        if busy:
+            await sent.wait()
+            await asyncio.sleep_ms(drain_ms)
@@ -0,0 +1,213 @@
+# squixl_bus.py
+# Shares the one I2C bus of a SQUiXL between asyncio tasks. A task leases the
+# bus for a transaction or a short run of them:
+#
+#   async with bus.lease(PRIO_TOUCH):
+#       n, points = touch.read_points()
+#
+# When the bus is free the lease is granted at once. Otherwise tasks wait in
+# priority order (touch, expander, haptics, battery) and FIFO within a
+# priority. I2C calls are synchronous, so a lease around a single call never
+# meets another task; the queue only comes into play when a holder awaits
+# inside its lease, e.g. a sequence of transactions with sleeps between
+# them. Keep such sequences in low priority leases short, one step per
+# lease, so a touch read waits for at most the step in progress.
+# Register writes that can be late are queued with write() and sent by
+# flush(), each under a lease of its own priority. Writes are only merged
+# into one burst for devices declared with the register layout they use
+# for multi-byte writes: AUTO_INCREMENT (the register pointer steps on) or
+# PORT_PAIRS (the LCA9555, whose data bytes alternate between the two
+# registers of a pair). Writes to other devices go out one by one, in order.
+# The DRV2605 batches its settings itself, see drv2605.hold() / flush().
+
+import asyncio
+from time import ticks_us, ticks_diff
+
+PRIO_TOUCH = 0
+PRIO_EXPANDER = 1
+PRIO_HAPTICS = 2
+PRIO_BATTERY = 3
+PRIORITIES = 4
+
+NAMES = ('touch', 'expander', 'haptics', 'battery')
+
+# Register layouts for declare()
+AUTO_INCREMENT = 0
+PORT_PAIRS = 1
+
+
+class _Lease:
+    # async context manager for one priority, made once per bus
+
+    def __init__(self, bus, priority):
+        self.bus = bus
+        self.priority = priority
+
+    async def __aenter__(self):
+        await self.bus.acquire(self.priority)
+        return self.bus.i2c
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.bus.release()
+
+
+class I2CBus:
+    """Priority arbitration, write batching and usage statistics for an I2C
+    bus. The machine.I2C object is bus.i2c."""
+
+    def __init__(self, i2c):
+        self.i2c = i2c
+        self.busy = False
+        self.holder = None      # priority of the current lease
+        self.waiting = []       # [priority, seq, event], highest first
+        self._seq = 0
+        self._leases = [_Lease(self, p) for p in range(PRIORITIES)]
+        self.layouts = {}       # addr: register layout, see declare()
+        self.pending = []       # [addr, reg, bytearray, priority] in arrival order
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.start = ticks_us()
+        self.grants = [0] * PRIORITIES
+        self.busy_us = [0] * PRIORITIES
+        self.wait_us = [0] * PRIORITIES
+        self.max_wait_us = [0] * PRIORITIES
+        self.writes_queued = 0
+        self.bursts = 0
+        self._granted = 0
+
+    # --- arbitration
+
+    def lease(self, priority):
+        return self._leases[priority]
+
+    async def acquire(self, priority):
+        t0 = ticks_us()
+        if self.busy:
+            event = asyncio.Event()
+            entry = [priority, self._seq, event]
+            self._seq += 1
+            i = 0
+            waiting = self.waiting
+            while i < len(waiting) and waiting[i][0] <= priority:
+                i += 1
+            waiting.insert(i, entry)
+            try:
+                await event.wait()
+            except asyncio.CancelledError:
+                # leave the queue, or pass on a grant that came too late
+                if event.is_set():
+                    self.holder = priority
+                    self._granted = ticks_us()
+                    self.release()
+                else:
+                    waiting.remove(entry)
+                raise
+        self.busy = True
+        self.holder = priority
+        now = ticks_us()
+        wait = ticks_diff(now, t0)
+        self.grants[priority] += 1
+        self.wait_us[priority] += wait
+        if wait > self.max_wait_us[priority]:
+            self.max_wait_us[priority] = wait
+        self._granted = now
+
+    def release(self):
+        self.busy_us[self.holder] += ticks_diff(ticks_us(), self._granted)
+        if self.waiting:
+            # hand over without freeing, so nothing can jump the queue
+            self.waiting.pop(0)[2].set()
+        else:
+            self.busy = False
+            self.holder = None
+
+    # --- single transactions
+
+    async def readfrom_mem(self, addr, reg, nbytes, priority=PRIO_BATTERY):
+        async with self._leases[priority]:
+            return self.i2c.readfrom_mem(addr, reg, nbytes)
+
+    async def writeto_mem(self, addr, reg, data, priority=PRIO_EXPANDER):
+        async with self._leases[priority]:
+            self.i2c.writeto_mem(addr, reg, data)
+
+    # --- batched writes
+
+    def declare(self, addr, layout):
+        """Let queued writes to addr merge into bursts, given how the device
+        steps through registers in a multi-byte write."""
+        self.layouts[addr] = layout
+
+    def write(self, addr, reg, data, priority=PRIO_EXPANDER):
+        """Queue a register write for the next flush()."""
+        self.writes_queued += 1
+        layout = self.layouts.get(addr)
+        if layout is not None:
+            # only the latest queued write to addr can take it, so a newer
+            # value is never sent before an older one
+            for i in range(len(self.pending) - 1, -1, -1):
+                entry = self.pending[i]
+                if entry[0] != addr:
+                    continue
+                start = entry[1]
+                end = start + len(entry[2])
+                lo = min(start, reg)
+                hi = max(end, reg + len(data))
+                if reg <= end and reg + len(data) >= start and (
+                        layout != PORT_PAIRS or lo >> 1 == (hi - 1) >> 1):
+                    # overwrite or extend the queued run of registers; a
+                    # port pair burst never leaves its pair
+                    buf = bytearray(hi - lo)
+                    buf[start - lo:end - lo] = entry[2]
+                    buf[reg - lo:reg - lo + len(data)] = data
+                    entry[1] = lo
+                    entry[2] = buf
+                    entry[3] = min(entry[3], priority)
+                    return
+                break
+        self.pending.append([addr, reg, bytearray(data), priority])
+
+    async def flush(self):
+        """Send queued writes, one burst per run of registers, each under a
+        lease of its own priority."""
+        while self.pending:
+            addr, reg, data, priority = self.pending.pop(0)
+            async with self._leases[priority]:
+                self.i2c.writeto_mem(addr, reg, data)
+            self.bursts += 1
+
+    async def run(self, interval_ms=10):
+        """Flush queued writes every interval_ms."""
+        while True:
+            if self.pending:
+                await self.flush()
+            await asyncio.sleep_ms(interval_ms)
+
+    # --- statistics
+
+    def stats(self):
+        elapsed = ticks_diff(ticks_us(), self.start)
+        busy = sum(self.busy_us)
+        return {
+            'elapsed_ms': elapsed // 1000,
+            'utilisation': round(busy / elapsed, 3) if elapsed > 0 else 0,
+            'writes_queued': self.writes_queued,
+            'bursts': self.bursts,
+            'leases': {NAMES[p]: {
+                'grants': self.grants[p],
+                'busy_ms': self.busy_us[p] // 1000,
+                'avg_wait_us': self.wait_us[p] // self.grants[p] if self.grants[p] else 0,
+                'max_wait_us': self.max_wait_us[p],
+            } for p in range(PRIORITIES)},
+        }
+
+    def report(self):
+        s = self.stats()
+        print('I2C bus: {}% busy over {} ms, {} writes sent in {} bursts'.format(
+            round(s['utilisation'] * 100, 1), s['elapsed_ms'], s['writes_queued'], s['bursts']))
+        print('lease        grants  busy ms  avg wait us  max wait us')
+        for name in NAMES:
+            p = s['leases'][name]
+            print('{:<10} {:>8} {:>8} {:>12} {:>12}'.format(
+                name, p['grants'], p['busy_ms'], p['avg_wait_us'], p['max_wait_us']))
@@ -0,0 +1,127 @@
+# squixl_haptics.py
+# Haptic feedback without blocking the task that asks for it. play() only
+# queues a request; the run() task loads the DRV2605 sequence and GO in one
+# I2C burst and then polls GO with asyncio sleeps until the motor is done.
+#
+#   haptics = squixl.haptics
+#   asyncio.create_task(haptics.run())
+#   ...
+#   haptics.play(1)                                  # strong click
+#   haptics.play(EFFECT_TICK, HAPTIC_TICK)           # from a slider callback
+#   haptics.play((47, Pause(0.1), 47), HAPTIC_ALERT) # up to 8 slots
+#
+# A request that repeats one already queued, playing, or started in the last
+# merge_ms is merged into it, so a burst of slider ticks is one buzz. A
+# request of higher priority than the one playing stops it and goes next.
+
+import asyncio
+from time import ticks_ms, ticks_diff
+from squixl_bus import PRIO_HAPTICS
+
+# request priorities, most urgent first
+HAPTIC_ALERT = 0
+HAPTIC_CONFIRM = 1
+HAPTIC_TICK = 2
+
+EFFECT_CLICK = 1        # TS2200 library: strong click 100%
+EFFECT_TICK = 24        # sharp tick 100%
+
+MERGE_MS = 80       # repeats within this long of a start are merged
+POLL_MS = 5         # GO polling period while a sequence plays
+QUEUE_LEN = 4       # requests waiting; the least urgent is dropped beyond this
+
+
+def slots_of(effect):
+    """Raw WAVESEQ values of an effect id, Effect, Pause or a sequence of
+    those, as a tuple of at most 8."""
+    if isinstance(effect, int):
+        return (effect,)
+    if hasattr(effect, 'raw_value'):
+        return (effect.raw_value,)
+    slots = tuple(e if isinstance(e, int) else e.raw_value for e in effect)
+    if len(slots) > 8:
+        raise ValueError('At most 8 slots')
+    return slots
+
+
+class HapticService:
+    """Priority queue of haptic effects played by one asyncio task. Give it
+    an I2CBus to make its I2C calls under haptics leases."""
+
+    def __init__(self, drv, bus=None, merge_ms=MERGE_MS, poll_ms=POLL_MS, queue_len=QUEUE_LEN):
+        self.drv = drv
+        self.bus = bus
+        self.merge_ms = merge_ms
+        self.poll_ms = poll_ms
+        self.queue_len = queue_len
+        self.pending = []       # [priority, seq, slots], most urgent first
+        self._seq = 0
+        self.current = None     # slots playing
+        self.last = None        # slots played last, and when they started
+        self.started = 0
+        self._flag = asyncio.ThreadSafeFlag()
+        # counters
+        self.requested = 0
+        self.merged = 0
+        self.played = 0
+        self.preempted = 0
+        self.dropped = 0
+        self.polls = 0
+
+    def play(self, effect, priority=HAPTIC_CONFIRM):
+        """Queue an effect (see slots_of). Returns at once."""
+        slots = slots_of(effect)
+        self.requested += 1
+        if self.last == slots and (self.current is not None
+                                   or ticks_diff(ticks_ms(), self.started) < self.merge_ms):
+            self.merged += 1
+            return
+        for entry in self.pending:
+            if entry[2] == slots:
+                entry[0] = min(entry[0], priority)
+                self.pending.sort()
+                self.merged += 1
+                return
+        entry = [priority, self._seq, slots]
+        self._seq += 1
+        pending = self.pending
+        i = 0
+        while i < len(pending) and pending[i][0] <= priority:
+            i += 1
+        pending.insert(i, entry)
+        if len(pending) > self.queue_len:
+            pending.pop()
+            self.dropped += 1
+        self._flag.set()
+
+    async def _call(self, fn, *args):
+        if self.bus is None:
+            return fn(*args)
+        async with self.bus.lease(PRIO_HAPTICS):
+            return fn(*args)
+
+    def _playing(self):
+        self.polls += 1
+        return self.drv.playing
+
+    async def run(self):
+        drv = self.drv
+        while True:
+            if not self.pending:
+                await self._flag.wait()
+                continue
+            priority, _, slots = self.pending.pop(0)
+            await self._call(drv.play_sequence, slots)
+            self.current = self.last = slots
+            self.started = ticks_ms()
+            self.played += 1
+            while True:
+                await asyncio.sleep_ms(self.poll_ms)
+                if self.pending and self.pending[0][0] < priority:
+                    # something more urgent: cut this one short
+                    await self._call(drv.stop)
+                    self.preempted += 1
+                    break
+                if not await self._call(self._playing):
+                    break
+            self.current = None
@@ -0,0 +1,169 @@
+# squixl_iomux.py
+# Leases the IOMUX pins to the SD card or the I2S amp, so a task reading SD
+# cannot pull the pins from under a playing sound.
+#
+#   mux = squixl.iomux
+#   async with mux.lease(IOMUX_SD):
+#       data = open('/sd/logo.bin', 'rb').read()
+#   clip = await mux.load('/sd/sounds/alert.wav')   # the same, into a BytesIO
+#   player = AudioPlayer(mux=mux)                    # plays under I2S leases
+#
+# Any number of tasks can hold leases for the side the mux is switched to.
+# Requests for the other side queue, and once the last holder releases they
+# are all granted together after a single switch, so SD reads batch up in
+# the gaps between sounds. A looping or long sound gives the pins up at a
+# chunk boundary once an SD request has waited wait_ms, and takes them back
+# when the batch is done. switch_us and the other counters show the cost.
+
+import io
+import asyncio
+from time import ticks_ms, ticks_us, ticks_diff
+import squixl
+from squixl import IOMUX_SD, IOMUX_I2S
+
+WAIT_MS = 250       # longest an SD batch waits for a sound that keeps playing
+
+
+class _MuxLease:
+
+    def __init__(self, mux, state):
+        self.mux = mux
+        self.state = state
+
+    async def __aenter__(self):
+        await self.mux.acquire(self.state)
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.mux.release()
+
+
+class IOMux:
+    """Arbiter for the SD / I2S IOMUX. Use lease() rather than calling
+    squixl.set_iomux() directly."""
+
+    def __init__(self, wait_ms=WAIT_MS):
+        self.wait_ms = wait_ms
+        self.holders = 0
+        self.waiting = {IOMUX_SD: [], IOMUX_I2S: []}   # [(since_ms, event)]
+        self._leases = {IOMUX_SD: _MuxLease(self, IOMUX_SD), IOMUX_I2S: _MuxLease(self, IOMUX_I2S)}
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.switches = 0
+        self.switch_us = 0
+        self.max_switch_us = 0
+        self.grants = {IOMUX_SD: 0, IOMUX_I2S: 0}
+        self.batches = 0        # switches that let more than one waiter in
+        self.yields = 0         # times a sound gave the pins up mid play
+        self.max_wait_ms = {IOMUX_SD: 0, IOMUX_I2S: 0}
+
+    def lease(self, state):
+        return self._leases[state]
+
+    @property
+    def state(self):
+        # read from squixl each time: set_iomux() and open_audio() called
+        # outside the arbiter switch the pins too
+        return squixl.current_iomux_state
+
+    def _other(self, state):
+        return IOMUX_I2S if state == IOMUX_SD else IOMUX_SD
+
+    def _switch(self, state):
+        if self.state == state:
+            return
+        t0 = ticks_us()
+        squixl.set_iomux(state)
+        us = ticks_diff(ticks_us(), t0)
+        self.switches += 1
+        self.switch_us += us
+        if us > self.max_switch_us:
+            self.max_switch_us = us
+
+    async def acquire(self, state):
+        since = ticks_ms()
+        other = self.waiting[self._other(state)]
+        if self.holders == 0:
+            self._switch(state)
+        elif self.state != state or other:
+            # wait for the holders to finish; behind a queued switch too, so
+            # a stream of same side leases cannot starve the other side
+            event = asyncio.Event()
+            entry = (since, event)
+            self.waiting[state].append(entry)
+            try:
+                await event.wait()
+            except asyncio.CancelledError:
+                # give back a grant that came too late, or leave the queue
+                if event.is_set():
+                    self.release()
+                else:
+                    self.waiting[state].remove(entry)
+                raise
+            wait = ticks_diff(ticks_ms(), since)
+            if wait > self.max_wait_ms[state]:
+                self.max_wait_ms[state] = wait
+            return
+        self.holders += 1
+        self.grants[state] += 1
+
+    def release(self):
+        self.holders -= 1
+        if self.holders:
+            return
+        # the side that has waited longest goes next
+        sd = self.waiting[IOMUX_SD]
+        i2s = self.waiting[IOMUX_I2S]
+        if not sd and not i2s:
+            return
+        if not i2s or (sd and ticks_diff(i2s[0][0], sd[0][0]) > 0):
+            state, queue = IOMUX_SD, sd
+        else:
+            state, queue = IOMUX_I2S, i2s
+        self._switch(state)
+        if len(queue) > 1:
+            self.batches += 1
+        self.holders += len(queue)
+        self.grants[state] += len(queue)
+        for since, event in queue:
+            event.set()
+        queue.clear()
+
+    def contended(self, state):
+        """True when a holder of state should give the pins up: the other
+        side has waited wait_ms."""
+        queue = self.waiting[self._other(state)]
+        return bool(queue) and ticks_diff(ticks_ms(), queue[0][0]) >= self.wait_ms
+
+    async def yield_lease(self, state):
+        """Let the waiting side in, then wait for state again."""
+        self.yields += 1
+        self.release()
+        await self.acquire(state)
+
+    async def load(self, path):
+        """Read a file from SD under an SD lease, into a BytesIO."""
+        async with self.lease(IOMUX_SD):
+            with open(path, 'rb') as f:
+                return io.BytesIO(f.read())
+
+    def stats(self):
+        return {
+            'state': self.state,
+            'switches': self.switches,
+            'switch_ms': self.switch_us // 1000,
+            'max_switch_us': self.max_switch_us,
+            'sd_grants': self.grants[IOMUX_SD],
+            'i2s_grants': self.grants[IOMUX_I2S],
+            'batches': self.batches,
+            'yields': self.yields,
+            'max_sd_wait_ms': self.max_wait_ms[IOMUX_SD],
+            'max_i2s_wait_ms': self.max_wait_ms[IOMUX_I2S],
+        }
+
+    def report(self):
+        s = self.stats()
+        print('IOMUX: {} switches, {} ms switching (max {} us), {} batched grants, {} yields'.format(
+            s['switches'], s['switch_ms'], s['max_switch_us'], s['batches'], s['yields']))
+        print('  SD: {} leases, max wait {} ms   I2S: {} leases, max wait {} ms'.format(
+            s['sd_grants'], s['max_sd_wait_ms'], s['i2s_grants'], s['max_i2s_wait_ms']))
@@ -0,0 +1,89 @@
+# squixl_profile.py
+# Boot time profiler. Call mark() at the end of each startup phase; every mark
+# records ticks_us and free heap, and report() prints where the time went:
+#
+#   import squixl_profile as profile     # first import in main.py
+#   ...imports...
+#   profile.mark('imports')
+#   ...build screens...
+#   profile.mark('screens')
+#   profile.report()
+#
+# prints each phase's duration, the time since the start, the free heap after
+# it and the heap it used.
+#
+# summary() is the same as a dict, to publish over MQTT as JSON, and save()
+# appends it to a JSON lines file so boots of different firmware releases can
+# be compared.
+
+import gc
+import sys
+import json
+from time import ticks_us, ticks_diff
+
+# time zero is the first import of this module
+_t0 = ticks_us()
+_free0 = gc.mem_free()
+_marks = []  # (name, us since start, free heap)
+
+enabled = True
+
+
+def start():
+    """Restart the clock and forget the marks so far."""
+    global _t0, _free0
+    _marks.clear()
+    _t0 = ticks_us()
+    _free0 = gc.mem_free()
+
+
+def mark(name):
+    """End the current phase and name it."""
+    if enabled:
+        _marks.append((name, ticks_diff(ticks_us(), _t0), gc.mem_free()))
+
+
+def phases():
+    """(name, us, at_us, free, heap_change) for every phase in order."""
+    out = []
+    last_us = 0
+    last_free = _free0
+    for name, at, free in _marks:
+        out.append((name, at - last_us, at, free, last_free - free))
+        last_us = at
+        last_free = free
+    return out
+
+
+def firmware():
+    try:
+        import os
+        return os.uname().version
+    except (ImportError, AttributeError):
+        return sys.version
+
+
+def summary():
+    """The profile as a dict of plain values, ready for json.dumps()."""
+    return {
+        'firmware': firmware(),
+        'total_ms': _marks[-1][1] // 1000 if _marks else 0,
+        'phases': [{'name': name, 'ms': us // 1000, 'free': free, 'heap': heap}
+                   for name, us, at, free, heap in phases()],
+    }
+
+
+def report():
+    print('phase                ms    at ms   free KB   heap KB')
+    for name, us, at, free, heap in phases():
+        print('{:<16} {:>6} {:>8} {:>9} {:>9}'.format(
+            name[:16], us // 1000, at // 1000, free // 1024, heap // 1024))
+    if _marks:
+        print('boot took {} ms'.format(_marks[-1][1] // 1000))
+
+
+def save(path='boot_profile.jsonl'):
+    """Append summary() to a JSON lines file."""
+    with open(path, 'a') as f:
+        f.write(json.dumps(summary()))
+        f.write('\n')
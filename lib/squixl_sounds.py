@@ -0,0 +1,196 @@
+# squixl_sounds.py
+# UI sounds made once at startup and mixed on the fly: no file I/O and no
+# allocation when a button plays one.
+#
+#   bank = default_bank()                    # click, tick, confirm, alert, error
+#   bank.tone('beep', 1760, 60)              # or make your own
+#   mixer = Mixer(bank, AudioPlayer(chunk=512, ibuf=2048))
+#   ...
+#   mixer.play('click')                      # from a button callback
+#
+# A small player chunk and I2S buffer keep the delay from play() to sound
+# short (12 + 46 ms here at 22 kHz); the mixer is always a chunk ahead.
+# Sounds are 16 bit mono at squixl.SAMPLE_RATE_IN_HZ in array('h') buffers.
+# The Mixer overlays up to `voices` of them with Q8 fixed point gains
+# (GAIN_ONE is unity) and is itself the source the AudioPlayer streams from:
+# it reads as PCM while any voice is sounding and ends the stream when all
+# are done.
+
+import math
+import micropython
+from array import array
+from squixl import SAMPLE_RATE_IN_HZ
+
+GAIN_ONE = 256
+AMPLITUDE = 12000       # peak of the stock sounds, leaves headroom to mix
+VOICES = 4
+MIX_SAMPLES = 1024      # most mixed per read: a 2 KB player chunk
+
+
+class SoundBank:
+    """Named array('h') sounds, synthesised or added ready made."""
+
+    def __init__(self, rate=SAMPLE_RATE_IN_HZ):
+        self.rate = rate
+        self.sounds = {}
+
+    def add(self, name, samples):
+        self.sounds[name] = samples
+        return samples
+
+    def __getitem__(self, name):
+        return self.sounds[name]
+
+    def _samples(self, ms):
+        return array('h', [0] * (self.rate * ms // 1000))
+
+    def tone(self, name, freq, ms, amplitude=AMPLITUDE, attack_ms=2, release_ms=20):
+        """A sine tone with a linear attack and release, so it starts and
+        stops without a click."""
+        out = self._samples(ms)
+        n = len(out)
+        attack = max(1, self.rate * attack_ms // 1000)
+        release = max(1, self.rate * release_ms // 1000)
+        step = 2 * math.pi * freq / self.rate
+        for i in range(n):
+            env = min(1, i / attack, (n - i) / release)
+            out[i] = int(amplitude * env * math.sin(step * i))
+        return self.add(name, out)
+
+    def tones(self, name, freqs, ms, gap_ms=20, amplitude=AMPLITUDE):
+        """Tones one after another, gap_ms of silence between them."""
+        parts = [self.tone(name, f, ms, amplitude) for f in freqs]
+        gap = self._samples(gap_ms)
+        out = array('h')
+        for i, part in enumerate(parts):
+            if i:
+                out.extend(gap)
+            out.extend(part)
+        return self.add(name, out)
+
+    def click(self, name, ms=6, amplitude=AMPLITUDE, seed=1):
+        """A burst of noise decaying to nothing, like a key click."""
+        out = self._samples(ms)
+        n = len(out)
+        x = seed
+        for i in range(n):
+            x = (x * 1103515245 + 12345) & 0x7FFFFFFF
+            noise = ((x >> 15) & 0xFFFF) - 0x8000
+            decay = (n - i) / n
+            out[i] = int(noise * amplitude * decay * decay) >> 15
+        return self.add(name, out)
+
+
+def default_bank(rate=SAMPLE_RATE_IN_HZ):
+    bank = SoundBank(rate)
+    bank.click('click')
+    bank.tone('tick', 3000, 8, amplitude=AMPLITUDE // 2, attack_ms=1, release_ms=6)
+    bank.tones('confirm', (1320, 1760), 50)
+    bank.tones('alert', (1760, 1320, 1760), 90)
+    bank.tone('error', 220, 200)
+    return bank
+
+
+class Mixer:
+    """Overlays up to `voices` bank sounds into 16 bit PCM. play() never
+    allocates once the player is running; a new sound takes a free voice or
+    the one that has played longest."""
+
+    def __init__(self, bank, player=None, voices=VOICES, mix_samples=MIX_SAMPLES):
+        self.bank = bank
+        self.player = player
+        self.sounds = [None] * voices
+        self.pos = array('i', [0] * voices)
+        self.gain = array('i', [0] * voices)
+        self._acc = array('i', [0] * mix_samples)
+        self.clipped = 0
+        self.ended = True       # readinto() has ended the stream
+
+    def play(self, name, gain=GAIN_ONE):
+        samples = self.bank.sounds[name]
+        sounds = self.sounds
+        pos = self.pos
+        voice = 0
+        for v in range(len(sounds)):
+            if sounds[v] is None:
+                voice = v
+                break
+            if pos[v] > pos[voice]:
+                voice = v
+        sounds[voice] = samples
+        pos[voice] = 0
+        self.gain[voice] = gain
+        player = self.player
+        # once readinto() has returned 0 the player only finishes its last
+        # buffer, so start a new stream even if it still says playing
+        if player is not None and (self.ended or not player.playing):
+            self.ended = False
+            player.play(self, rate=self.bank.rate)
+
+    def stop(self):
+        for v in range(len(self.sounds)):
+            self.sounds[v] = None
+
+    @property
+    def active(self):
+        return sum(1 for s in self.sounds if s is not None)
+
+    # --- the stream interface AudioPlayer reads from
+
+    def tell(self):
+        return 0
+
+    def seek(self, pos):
+        pass
+
+    def readinto(self, buf):
+        """Mix the next samples into buf as little endian 16 bit PCM. Returns
+        the byte count, 0 once every voice has finished."""
+        acc = self._acc
+        n = min(len(buf) // 2, len(acc))
+        self._clear(acc, n)
+        active = False
+        sounds = self.sounds
+        for v in range(len(sounds)):
+            samples = sounds[v]
+            if samples is None:
+                continue
+            active = True
+            p = self.pos[v]
+            m = min(n, len(samples) - p)
+            self._add(acc, samples, p, m, self.gain[v])
+            p += m
+            if p >= len(samples):
+                sounds[v] = None
+            else:
+                self.pos[v] = p
+        if not active:
+            self.ended = True
+            return 0
+        self.clipped += self._store(buf, acc, n)
+        return 2 * n
+
+    @micropython.native
+    def _clear(self, acc, n):
+        for i in range(n):
+            acc[i] = 0
+
+    @micropython.native
+    def _add(self, acc, samples, p, m, gain):
+        for i in range(m):
+            acc[i] += (samples[p + i] * gain) >> 8
+
+    @micropython.native
+    def _store(self, buf, acc, n):
+        clipped = 0
+        for i in range(n):
+            v = acc[i]
+            if v > 32767:
+                v = 32767
+                clipped += 1
+            elif v < -32768:
+                v = -32768
+                clipped += 1
+            buf[2 * i] = v & 0xFF
+            buf[2 * i + 1] = (v >> 8) & 0xFF
+        return clipped
@@ -0,0 +1,457 @@
+# squixl_touch.py
+# Interrupt driven touch input for SQUiXL.
+#
+# The GT911 pulses its INT line (IO3) once per report while a finger is on
+# the panel. TouchReader sleeps on a ThreadSafeFlag set from that IRQ, so the
+# I2C bus is left alone while nobody touches the screen; once a finger lands
+# it reads points at the controller's report rate until the finger lifts.
+# Each change is posted as a timestamped event into a bounded queue.
+#
+# With more than one finger down, TouchTracker follows every point the
+# GT911 reports (up to 5) under a stable ID, and the reader posts the centre
+# and spread of the first two fingers instead of single finger samples.
+#
+# GestureRecognizer turns that raw stream into the UI's TouchEvents: taps,
+# double taps and long presses, drags while the finger moves, and a swipe
+# when a drag is released fast enough; pinches, two finger drags and two
+# finger taps.
+
+import asyncio
+from array import array
+from machine import Pin
+from time import ticks_ms, ticks_diff, ticks_add
+from squixl_bus import PRIO_TOUCH
+from squixl_ui_EX import (TouchEvent, TOUCH_TAP, TOUCH_DOUBLE, TOUCH_LONG,
+    TOUCH_DRAG, TOUCH_DRAG_END, TOUCH_SWIPE_UP, TOUCH_SWIPE_DOWN,
+    TOUCH_SWIPE_LEFT, TOUCH_SWIPE_RIGHT, TOUCH_PINCH, TOUCH_TWO_DRAG,
+    TOUCH_TWO_END, TOUCH_TWO_TAP)
+
+TOUCH_IRQ_PIN = 3   # GT911 INT
+REPORT_MS = 10      # GT911 report period
+QUEUE_SIZE = 16
+MAX_POINTS = 5      # GT911 touch points
+MATCH_DIST = 80     # px a finger may move between samples and keep its ID
+
+# raw touch event kinds
+TOUCH_DOWN = 0
+TOUCH_MOVE = 1
+TOUCH_UP = 2
+TOUCH_MULTI = 3     # two or more fingers: x, y centre and size the spread
+TOUCH_MULTI_END = 4 # back to fewer than two fingers
+
+# Gesture thresholds
+TAP_MOVE = 20           # px the finger may wander before a press becomes a drag
+LONG_MS = 700           # press held this long is a long press
+DOUBLE_MS = 300         # max gap between the taps of a double tap
+DOUBLE_MOVE = 30        # max distance between the taps of a double tap
+SWIPE_MIN = 60          # px a drag must cover to count as a swipe
+SWIPE_VELOCITY = 300    # px/s a drag must still be moving at when released
+STILL_MS = 60           # no movement for this long before release means no fling
+PINCH_MIN = 20          # px the finger spread must change to start a pinch
+TWO_TAP_MS = 300        # two fingers lifted within this without moving is a tap
+
+# recognizer states
+_IDLE = 0
+_PRESSED = 1
+_DRAGGING = 2
+_LONG = 3
+_TWO = 4        # two finger gesture in progress
+_TWO_DONE = 5   # two finger gesture over, waiting for the last finger to lift
+
+
+def _isqrt(v):
+    # integer square root, so tracking stays clear of (heap allocated) floats
+    if v <= 0:
+        return 0
+    x = v
+    y = (x + 1) >> 1
+    while y < x:
+        x = y
+        y = (x + v // x) >> 1
+    return x
+
+
+class TouchQueue:
+    """Bounded ring of (kind, x, y, size, ticks_ms) events. When full the
+    oldest event is dropped, so a stalled consumer sees the latest touches."""
+
+    def __init__(self, size=QUEUE_SIZE):
+        self.size = size
+        self._events = [None] * size
+        self._head = 0      # next event to get
+        self._count = 0
+        self.dropped = 0
+        self._flag = asyncio.ThreadSafeFlag()
+
+    def __len__(self):
+        return self._count
+
+    def put(self, kind, x, y, size, t):
+        if self._count == self.size:
+            self._head = (self._head + 1) % self.size
+            self._count -= 1
+            self.dropped += 1
+        self._events[(self._head + self._count) % self.size] = (kind, x, y, size, t)
+        self._count += 1
+        self._flag.set()
+
+    def get_nowait(self):
+        """Oldest event, or None if the queue is empty."""
+        if not self._count:
+            return None
+        evt = self._events[self._head]
+        self._events[self._head] = None
+        self._head = (self._head + 1) % self.size
+        self._count -= 1
+        return evt
+
+    async def get(self):
+        while not self._count:
+            await self._flag.wait()
+        return self.get_nowait()
+
+    def clear(self):
+        while self._count:
+            self.get_nowait()
+
+
+class TouchTracker:
+    """Follows up to MAX_POINTS fingers from sample to sample, giving each an
+    ID it keeps until lifted. State lives in preallocated arrays, so
+    update() does not allocate; ID 0 marks a free slot."""
+
+    def __init__(self, match_dist=MATCH_DIST):
+        self.match_sq = match_dist * match_dist
+        self.ids = bytearray(MAX_POINTS)
+        self.xs = array('h', bytes(2 * MAX_POINTS))
+        self.ys = array('h', bytes(2 * MAX_POINTS))
+        self.born = array('H', bytes(2 * MAX_POINTS))  # landing order
+        self.count = 0
+        self.next_id = 1
+        self.clock = 0
+        # the first two fingers down: centre and distance apart
+        self.cx = self.cy = self.spread = 0
+
+    def update(self, n, points):
+        n = min(n, MAX_POINTS)
+        ids = self.ids
+        xs = self.xs
+        ys = self.ys
+        born = self.born
+        used = 0  # bit i set: points[i] belongs to a tracked finger
+        for s in range(MAX_POINTS):
+            if not ids[s]:
+                continue
+            # nearest unclaimed point within reach, else the finger lifted
+            best = -1
+            best_d = self.match_sq
+            for i in range(n):
+                if used >> i & 1:
+                    continue
+                dx = points[i][0] - xs[s]
+                dy = points[i][1] - ys[s]
+                d = dx * dx + dy * dy
+                if d <= best_d:
+                    best = i
+                    best_d = d
+            if best < 0:
+                ids[s] = 0
+            else:
+                used |= 1 << best
+                xs[s] = points[best][0]
+                ys[s] = points[best][1]
+        for i in range(n):
+            if used >> i & 1:
+                continue
+            for s in range(MAX_POINTS):
+                if not ids[s]:
+                    ids[s] = self.next_id
+                    self.next_id = self.next_id % 255 + 1
+                    xs[s] = points[i][0]
+                    ys[s] = points[i][1]
+                    self.clock = (self.clock + 1) & 0xFFFF
+                    born[s] = self.clock
+                    break
+        # count, and the two fingers that landed first
+        count = 0
+        a = b = -1
+        for s in range(MAX_POINTS):
+            if not ids[s]:
+                continue
+            count += 1
+            if a < 0 or born[s] < born[a]:
+                b = a
+                a = s
+            elif b < 0 or born[s] < born[b]:
+                b = s
+        self.count = count
+        if count >= 2:
+            self.cx = (xs[a] + xs[b]) >> 1
+            self.cy = (ys[a] + ys[b]) >> 1
+            dx = xs[a] - xs[b]
+            dy = ys[a] - ys[b]
+            self.spread = _isqrt(dx * dx + dy * dy)
+
+    def reset(self):
+        for s in range(MAX_POINTS):
+            self.ids[s] = 0
+        self.count = 0
+
+
+class TouchReader:
+    """Reads the GT911 only while a finger is down, woken by its INT pin.
+    With irq_pin=None nothing is read; samples are pushed in with sample().
+    Given an I2CBus, every read is made under a touch priority lease."""
+
+    def __init__(self, touch, irq_pin=TOUCH_IRQ_PIN, report_ms=REPORT_MS, queue_size=QUEUE_SIZE,
+                 bus=None):
+        self.touch = touch
+        self.bus = bus
+        self.report_ms = report_ms
+        self.queue = TouchQueue(queue_size)
+        self.reads = 0      # I2C point reads, for comparing with polling
+        self.down = False
+        self.x = self.y = -1
+        self.tracker = TouchTracker()
+        self.multi = False      # more than one finger since this touch began
+        self.pair = False       # two or more fingers down right now
+        self.spread = 0
+        self._flag = asyncio.ThreadSafeFlag()
+        self._pin = None
+        if irq_pin is not None:
+            self._pin = Pin(irq_pin, Pin.IN)
+            self._pin.irq(self._irq, Pin.IRQ_FALLING)
+
+    def _irq(self, pin):
+        self._flag.set()
+
+    def stop(self):
+        if self._pin is not None:
+            self._pin.irq(None)
+
+    def sample(self, n, points, t):
+        """Queue the change one read_points() result makes. Returns True
+        while a finger is down."""
+        tracker = self.tracker
+        tracker.update(n, points)
+        if n > 1:
+            # the single finger stream pauses while two fingers are down
+            if not self.pair or tracker.cx != self.x or tracker.cy != self.y or tracker.spread != self.spread:
+                self.queue.put(TOUCH_MULTI, tracker.cx, tracker.cy, tracker.spread, t)
+            self.x = tracker.cx
+            self.y = tracker.cy
+            self.spread = tracker.spread
+            self.multi = self.pair = self.down = True
+            return True
+        if self.pair:
+            self.queue.put(TOUCH_MULTI_END, self.x, self.y, 0, t)
+            self.pair = False
+        if n and self.multi:
+            return True     # wait for the last finger to lift
+        if n:
+            x, y, size = points[0][0], points[0][1], points[0][2]
+            if not self.down:
+                self.queue.put(TOUCH_DOWN, x, y, size, t)
+                self.down = True
+            elif x != self.x or y != self.y:
+                self.queue.put(TOUCH_MOVE, x, y, size, t)
+            self.x = x
+            self.y = y
+            return True
+        if self.down:
+            self.queue.put(TOUCH_UP, self.x, self.y, 0, t)
+            self.down = False
+        self.multi = False
+        return False
+
+    async def run(self):
+        while True:
+            # idle until the controller reports a touch
+            await self._flag.wait()
+            while True:
+                if self.bus is None:
+                    n, points = self.touch.read_points()
+                else:
+                    async with self.bus.lease(PRIO_TOUCH):
+                        n, points = self.touch.read_points()
+                self.reads += 1
+                # a report with no points (noise on INT) or the finger lifting
+                if not self.sample(n, points, ticks_ms()):
+                    break
+                await asyncio.sleep_ms(self.report_ms)
+            if self.bus is None:
+                self.touch.clear_points()
+            else:
+                async with self.bus.lease(PRIO_TOUCH):
+                    self.touch.clear_points()
+            # INT kept pulsing while we sampled; those reports are consumed
+            self._flag.clear()
+
+
+class GestureRecognizer:
+    """State machine from raw down/move/up samples to TouchEvents, passed to
+    handler(evt) as soon as they are recognised: TOUCH_DRAG for every move
+    once the finger has left the tap radius, TOUCH_LONG while still held.
+    A double tap is reported as TOUCH_TAP then TOUCH_DOUBLE, and a fast
+    release as TOUCH_SWIPE_* then TOUCH_DRAG_END. Two fingers give
+    TOUCH_PINCH once their spread changes, or TOUCH_TWO_DRAG once they move
+    together, then TOUCH_TWO_END; or TOUCH_TWO_TAP if they lift quickly
+    without doing either. A second finger ends a single finger drag."""
+
+    def __init__(self, handler, tap_move=TAP_MOVE, long_ms=LONG_MS, double_ms=DOUBLE_MS,
+                 double_move=DOUBLE_MOVE, swipe_min=SWIPE_MIN, swipe_velocity=SWIPE_VELOCITY,
+                 pinch_min=PINCH_MIN, two_tap_ms=TWO_TAP_MS):
+        self.handler = handler
+        self.tap_move = tap_move
+        self.long_ms = long_ms
+        self.double_ms = double_ms
+        self.double_move = double_move
+        self.swipe_min = swipe_min
+        self.swipe_velocity = swipe_velocity
+        self.pinch_min = pinch_min
+        self.two_tap_ms = two_tap_ms
+        self.state = _IDLE
+        self.x0 = self.y0 = self.t0 = 0     # where and when the finger went down
+        self.x = self.y = self.t = 0        # latest sample
+        self.vx = self.vy = 0               # smoothed velocity, px/s
+        self.tap_x = self.tap_y = 0         # last tap, for double taps
+        self.tap_t = None
+        self.spread0 = 1                    # finger spread when two went down
+        self.two = None                     # TOUCH_PINCH / TOUCH_TWO_DRAG once decided
+
+    def _emit(self, kind, x, y, scale=1):
+        self.handler(TouchEvent(kind, x, y, x - self.x0, y - self.y0, self.vx, self.vy, self.t, scale))
+
+    def feed(self, kind, x, y, size, t):
+        """Consume one raw sample (as queued by TouchReader)."""
+        if kind == TOUCH_DOWN:
+            self.state = _PRESSED
+            self.x0 = self.x = x
+            self.y0 = self.y = y
+            self.t0 = self.t = t
+            self.vx = self.vy = 0
+            return
+        if kind == TOUCH_MULTI or kind == TOUCH_MULTI_END:
+            self._two(kind, x, y, size, t)
+            return
+        if self.state == _IDLE:
+            return
+        if self.state == _TWO_DONE and kind == TOUCH_MOVE:
+            return
+        if kind == TOUCH_MOVE:
+            dt = ticks_diff(t, self.t)
+            if dt > 0:
+                # average with the previous estimate to smooth report jitter
+                self.vx = (self.vx + (x - self.x) * 1000 // dt) // 2
+                self.vy = (self.vy + (y - self.y) * 1000 // dt) // 2
+            self.x = x
+            self.y = y
+            self.t = t
+            if self.state == _PRESSED:
+                self.check_long(t)
+            if self.state != _DRAGGING and (abs(x - self.x0) > self.tap_move
+                                            or abs(y - self.y0) > self.tap_move):
+                self.state = _DRAGGING
+            if self.state == _DRAGGING:
+                self._emit(TOUCH_DRAG, x, y)
+            return
+        # TOUCH_UP
+        if self.state == _PRESSED:
+            self.check_long(t)
+        if self.state == _PRESSED:
+            self.t = t
+            self._tap(t)
+        elif self.state == _DRAGGING:
+            if ticks_diff(t, self.t) > STILL_MS:
+                self.vx = self.vy = 0  # finger stopped before it lifted
+            self.t = t
+            swipe = self.swipe()
+            if swipe is not None:
+                self._emit(swipe, self.x, self.y)
+            self._emit(TOUCH_DRAG_END, self.x, self.y)
+        self.state = _IDLE
+
+    def _two(self, kind, x, y, spread, t):
+        if kind == TOUCH_MULTI_END:
+            if self.state == _TWO:
+                self.t = t
+                if self.two is not None:
+                    self._emit(TOUCH_TWO_END, self.x, self.y)
+                elif ticks_diff(t, self.t0) <= self.two_tap_ms:
+                    self._emit(TOUCH_TWO_TAP, self.x, self.y)
+            self.state = _TWO_DONE
+            return
+        if self.state != _TWO:
+            if self.state == _DRAGGING:
+                self._emit(TOUCH_DRAG_END, self.x, self.y)
+            self.state = _TWO
+            self.two = None
+            self.x0 = self.x = x
+            self.y0 = self.y = y
+            self.t0 = self.t = t
+            self.vx = self.vy = 0
+            self.spread0 = max(1, spread)
+            self.tap_t = None
+            return
+        self.x = x
+        self.y = y
+        self.t = t
+        if self.two != TOUCH_PINCH and abs(spread - self.spread0) > self.pinch_min:
+            self.two = TOUCH_PINCH
+        elif self.two is None and (abs(x - self.x0) > self.tap_move or abs(y - self.y0) > self.tap_move):
+            self.two = TOUCH_TWO_DRAG
+        if self.two == TOUCH_PINCH:
+            self._emit(TOUCH_PINCH, x, y, spread / self.spread0)
+        elif self.two == TOUCH_TWO_DRAG:
+            self._emit(TOUCH_TWO_DRAG, x, y)
+
+    def _tap(self, t):
+        x0 = self.x0
+        y0 = self.y0
+        if (self.tap_t is not None and ticks_diff(self.t0, self.tap_t) <= self.double_ms
+                and abs(x0 - self.tap_x) <= self.double_move and abs(y0 - self.tap_y) <= self.double_move):
+            self.tap_t = None
+            self._emit(TOUCH_DOUBLE, x0, y0)
+            return
+        self.tap_x = x0
+        self.tap_y = y0
+        self.tap_t = t
+        self._emit(TOUCH_TAP, x0, y0)
+
+    def check_long(self, now):
+        """Report a long press once the finger has been held still long enough.
+        Called on samples and by run() when no sample arrives."""
+        if self.state == _PRESSED and ticks_diff(now, self.t0) >= self.long_ms:
+            self.state = _LONG
+            self.tap_t = None
+            self._emit(TOUCH_LONG, self.x, self.y)
+
+    def swipe(self):
+        """Swipe direction of the current drag, or None."""
+        dx = self.x - self.x0
+        dy = self.y - self.y0
+        if abs(dx) >= abs(dy):
+            if abs(dx) < self.swipe_min or abs(self.vx) < self.swipe_velocity:
+                return None
+            return TOUCH_SWIPE_RIGHT if dx > 0 else TOUCH_SWIPE_LEFT
+        if abs(dy) < self.swipe_min or abs(self.vy) < self.swipe_velocity:
+            return None
+        return TOUCH_SWIPE_DOWN if dy > 0 else TOUCH_SWIPE_UP
+
+    async def run(self, queue):
+        """Recognise gestures from a TouchQueue forever."""
+        while True:
+            if self.state == _PRESSED:
+                # a long press has no sample of its own, so wake up for it
+                wait = ticks_diff(ticks_add(self.t0, self.long_ms), ticks_ms())
+                if wait > 0:
+                    try:
+                        evt = await asyncio.wait_for_ms(queue.get(), wait)
+                    except asyncio.TimeoutError:
+                        continue
+                else:
+                    self.check_long(ticks_ms())
+                    continue
+            else:
+                evt = await queue.get()
+            self.feed(*evt)
@@ -2,16 +2,24 @@
 import framebuf
 import math
 import array
+import asyncio
+import gc
 
 # import the CWriter class from Peter Hinch
 # https://github.com/peterhinch/micropython-font-to-py
 from writer import CWriter
 from boolpalette import BoolPalette
-from time import sleep_ms
+from textcache import TextCache, text_width, render_run
+from time import sleep_ms, ticks_ms, ticks_diff
 from colors import *
 
 # Configuration
 TOUCH_PADDING = 10  # Extra pixels around each control for easier touching
+FRAME_RATE = 20     # Default frames per second of the UIManager render task
+TOUCH_GRID_CELL = 40  # Cell size in pixels of the per screen touch index
+TEXT_CACHE_BYTES = 96 * 1024  # Byte budget of the rendered text cache (2 per pixel), 0 disables it
+SCREEN_WIDTH = 480
+SCREEN_HEIGHT = 480
 
 # Touch event types
 TOUCH_TAP        = 0
@@ -24,6 +32,15 @@ TOUCH_SWIPE_LEFT = 6
 TOUCH_DRAG       = 7
 TOUCH_DRAG_END   = 8
 TOUCH_UNKNOWN    = 9
+TOUCH_PINCH      = 10   # two fingers spreading/closing, evt.scale vs. the start
+TOUCH_TWO_DRAG   = 11   # two fingers moving together
+TOUCH_TWO_END    = 12   # end of a pinch or two finger drag
+TOUCH_TWO_TAP    = 13
+
+# Events that continue a touch and so go to the control that took its start,
+# and the events that end such a touch
+TOUCH_CONTINUED = (TOUCH_DRAG, TOUCH_DRAG_END, TOUCH_PINCH, TOUCH_TWO_DRAG, TOUCH_TWO_END)
+TOUCH_ENDS = (TOUCH_DRAG_END, TOUCH_TWO_END)
 
 
 ALIGNMENT_LEFT = 0
@@ -38,36 +55,152 @@ def rgb_to_565(r, g, b):
     u16 |= ((r >> 3) << 11)
     return u16
 
+# Helpers for (x, y, w, h) rectangles used by the redraw bookkeeping
+def rect_intersects(a, b):
+    """True if rectangles a and b share at least one pixel."""
+    return (a[0] < b[0] + b[2] and b[0] < a[0] + a[2] and
+            a[1] < b[1] + b[3] and b[1] < a[1] + a[3])
+
+def rect_union(a, b):
+    """Smallest rectangle covering both a and b."""
+    x = min(a[0], b[0])
+    y = min(a[1], b[1])
+    return (x, y, max(a[0] + a[2], b[0] + b[2]) - x, max(a[1] + a[3], b[1] + b[3]) - y)
+
+# Raw pixel bytes of a surface. FrameBuffers expose them through the buffer
+# protocol; the host simulator's FrameBuffer only through its buffer attribute
+def pixel_view(surface):
+    try:
+        return memoryview(surface)
+    except TypeError:
+        return memoryview(surface.buffer)
+
+# Copy rectangle (x, y, w, h) between two SCREEN_WIDTH wide RGB565 surfaces
+def copy_rect(dst, src, rect):
+    x, y, w, h = rect
+    if x < 0:
+        w += x
+        x = 0
+    if y < 0:
+        h += y
+        y = 0
+    w = min(w, SCREEN_WIDTH - x)
+    h = min(h, SCREEN_HEIGHT - y)
+    if w <= 0 or h <= 0:
+        return
+    d = pixel_view(dst)
+    s = pixel_view(src)
+    stride = SCREEN_WIDTH * 2
+    if x == 0 and w == SCREEN_WIDTH:
+        start = y * stride
+        d[start:start + h * stride] = s[start:start + h * stride]
+        return
+    start = y * stride + x * 2
+    n = w * 2
+    for _ in range(h):
+        d[start:start + n] = s[start:start + n]
+        start += stride
+
+# Fixed point sine table shared by all dials: one entry per quarter degree,
+# scaled by 2**TRIG_SHIFT. Built on first use.
+TRIG_STEPS = 1440
+TRIG_SHIFT = 14
+_sin_table = None
+
+def sin_table():
+    global _sin_table
+    if _sin_table is None:
+        scale = 1 << TRIG_SHIFT
+        _sin_table = array.array('h', (int(round(math.sin(math.radians(i / 4)) * scale))
+                                       for i in range(TRIG_STEPS)))
+    return _sin_table
+
+def polar_point(ox, oy, radius, angle):
+    """Screen point at radius from (ox, oy) with angle in degrees clockwise
+    from 12 o'clock, using the shared sine table."""
+    table = sin_table()
+    i = int((angle % 360) * 4 + 0.5) % TRIG_STEPS
+    half = 1 << (TRIG_SHIFT - 1)
+    x = (radius * table[i] + half) >> TRIG_SHIFT
+    y = (radius * table[(i + TRIG_STEPS // 4) % TRIG_STEPS] + half) >> TRIG_SHIFT
+    return (ox + x, oy - y)
+
 # Create a CWrite device using the same Framebuf buffer that SQUiXL uses
 class WriterDevice(framebuf.FrameBuffer):
     def __init__(self, buffer):
-        self.width = 480
-        self.height = 480
+        self.width = SCREEN_WIDTH
+        self.height = SCREEN_HEIGHT
         self.buffer = buffer
         self.mode = framebuf.RGB565
         self.palette = BoolPalette(self.mode)
         super().__init__(self.buffer, self.width, self.height, self.mode)
 
      
+# Cache of pre-rendered text runs used by print_text
+text_cache = TextCache(TEXT_CACHE_BYTES) if TEXT_CACHE_BYTES else None
+
+def set_text_cache(max_bytes):
+    """Resize (or with 0 disable) the rendered text cache."""
+    global text_cache
+    text_cache = TextCache(max_bytes) if max_bytes else None
+
 # Function to print text to screen via CWriter device
+# wbuf need not be the device the CWriter was created for (e.g. an off screen
+# copy), in which case the text is rendered as a run and blitted
 def print_text(wbuf, font, text, x, y, fg_colour, bg_colour):
+    if not text:
+        return
+    if '\n' in text or '\t' in text:
+        if wbuf is not font.device:
+            for n, line in enumerate(text.replace('\t', '    ').split('\n')):
+                print_text(wbuf, font, line, x, y + n * font.height, fg_colour, bg_colour)
+            return
+    elif text_width(font, text) <= SCREEN_WIDTH - x:
+        # single line text that fits is blitted from the cache in one go
+        if text_cache is not None:
+            wbuf.blit(text_cache.get(font, text, fg_colour, bg_colour), x, y)
+            return
+        if wbuf is not font.device:
+            wbuf.blit(render_run(font, text, fg_colour, bg_colour)[0], x, y)
+            return
+    elif wbuf is not font.device:
+        # too long for the line: CWriter wraps it, pointed at the copy for
+        # the call so an off screen copy matches the display
+        device, devid = font.device, font.devid
+        font.device, font.devid = wbuf, id(wbuf)
+        try:
+            print_text(wbuf, font, text, x, y, fg_colour, bg_colour)
+        finally:
+            font.device, font.devid = device, devid
+        return
     CWriter.set_textpos(wbuf, y, x)
     font.setcolor(fgcolor=fg_colour, bgcolor=bg_colour)
     font.printstring(text)
 
 # Touch event class for capturing touches
 class TouchEvent:
-    """Encapsulates a touch event."""
-    def __init__(self, event_type, x, y):
+    """Encapsulates a touch event. Gestures also carry the movement since the
+    finger went down (dx, dy), its velocity in px/s (vx, vy) and the ticks_ms
+    time of the sample. Two finger events are placed at the fingers' centre
+    and a pinch has the finger spread relative to its start in scale."""
+    def __init__(self, event_type, x, y, dx=0, dy=0, vx=0, vy=0, t=0, scale=1):
         self.type = event_type
         self.x = x
         self.y = y
+        self.dx = dx
+        self.dy = dy
+        self.vx = vx
+        self.vy = vy
+        self.t = t
+        self.scale = scale
 
 # Screen Control (widgets) **************************************************
 
 # Base class for all UI items
 class UIControl:
     """Base class for all controls."""
+    touchable = True  # False for controls that never consume touches
+
     def __init__(self, x, y, w, h, text=None, callback=None,
                  fg_color=0xFFFF, bg_color=None, text_color=WHITE):
         self.x = x
@@ -84,10 +217,64 @@ class UIControl:
         self.assigned_screen = None # Set by UIManager
         self.align = ALIGNMENT_LEFT
         self.align_offset = 0
+        self.painted_rect = None # Set by UIManager when the control is drawn
 
     def draw(self):
         raise NotImplementedError
 
+    def update(self):
+        """Repaint in place after a value change. Controls that always paint
+        their whole bounds can simply draw again."""
+        self.draw()
+
+    def bounds(self):
+        """Return the (x, y, w, h) rectangle this control paints."""
+        return (self.x, self.y, self.w, self.h)
+
+    def touch_bounds(self):
+        """Return the unpadded (x, y, w, h) rectangle that accepts touches."""
+        return (self.x, self.y, self.w, self.h)
+
+    def set_geometry(self, x, y, w=None, h=None):
+        """Move and/or resize the control, keeping the manager's touch index
+        and the screen in step."""
+        self.invalidate()
+        self.x = x
+        self.y = y
+        if w is not None:
+            self.w = w
+        if h is not None:
+            self.h = h
+        if self.manager is not None:
+            self.manager.geometry_changed(self)
+        self.invalidate()
+
+    def invalidate(self):
+        """Ask the manager to clear and repaint this control (old and new
+        extent) on the next redraw. Use when the painted area can change."""
+        if self.manager is not None:
+            self.manager.invalidate_control(self)
+
+    def refresh(self):
+        """Ask the manager to call update() on the next redraw."""
+        if self.manager is not None:
+            self.manager.refresh_control(self)
+
+    def post(self, value):
+        """Pass a new value to apply(). While the manager's render task runs
+        the value is held until the next frame and only the latest one posted
+        in that frame is applied."""
+        if self.manager is not None and self.manager.rendering:
+            self.manager.pending[self] = value
+        else:
+            self.apply(value)
+
+    def apply(self, value):
+        raise NotImplementedError
+
+    def get_font(self):
+        return self.font if self.font is not None else self.manager.font
+
     def within_bounds(self, x, y, w=None, h=None, pad=None):
         """Check if (x,y) is within padded bounds of this control."""
         w = w or self.w
@@ -106,28 +293,39 @@ class UIControl:
         if self.bg_color is not None:
             return self.bg_color
         else:
-            return self.manager.screens[self.manager.current_screen]['bg_color']
+            return self.manager.screens[self.assigned_screen]['bg_color']
         
 # ------------------------------------------------------------
 class UILabel(UIControl):
     """A simple text label."""
+    touchable = False
+
     def __init__(self, x, y, w, h, text=None, callback=None,fg_color=None, bg_color=None, text_color=WHITE):
         super().__init__(x, y, w, h, text, callback,fg_color, bg_color, text_color)
         self.text_width_pixels = 0   
 
-    def draw(self):
-        if self.manager is None:
-            return
-        self.erase_text()
-        _font = self.font if self.font is not None else self.manager.font
-        self.text_width_pixels = len(self.text) * _font.font.max_width()        
-        self.align_offset = 0
+    def _layout(self, _font):
+        # returns (align offset, text width in pixels) for the current text
+        text_width_pixels = text_width(_font, self.text)
+        align_offset = 0
         if self.align != ALIGNMENT_LEFT and self.w > 0:
             if self.align == ALIGNMENT_RIGHT:
-               self.align_offset = self.w - self.text_width_pixels
+               align_offset = self.w - text_width_pixels
             elif self.align == ALIGNMENT_CENTER:
-                self.align_offset = int(self.w/2 - self.text_width_pixels/2)
-    
+                align_offset = int(self.w/2 - text_width_pixels/2)
+        return align_offset, text_width_pixels
+
+    def bounds(self):
+        _font = self.get_font()
+        align_offset, text_width_pixels = self._layout(_font)
+        return (self.x + align_offset, self.y, text_width_pixels, _font.height)
+
+    def draw(self):
+        # the manager clears the old text extent before calling draw
+        if self.manager is None:
+            return
+        _font = self.get_font()
+        self.align_offset, self.text_width_pixels = self._layout(_font)
         print_text(self.manager.buf, _font, self.text, self.x + self.align_offset, self.y, self.text_color, self.get_back_color())
 
     def erase_text(self):
@@ -140,10 +338,11 @@ class UILabel(UIControl):
         self.manager.buf.rect(self.x + self.align_offset, self.y, self.text_width_pixels, _font.height, self.get_back_color(), True)
         
     def set_text(self, text):
+        self.post(text)
+
+    def apply(self, text):
         self.text = text
-        #_font = self.font if self.font is not None else self.manager.font
-        if self.manager.current_screen == self.assigned_screen:
-            self.draw()
+        self.invalidate()
 
     def set_alignment(self, align):
         self.align = align
@@ -156,6 +355,8 @@ class UILabel(UIControl):
 # ------------------------------------------------------------
 class UITextBox(UIControl):
     """A a container within which text is updated."""
+    touchable = False
+
     def __init__(self, x, y, w, h, text="", callback=None,
                  fg_color=None, bg_color=None, text_color=0xFFFF, bd_clearance = 2):
         super().__init__(x, y, w, h, text, callback, fg_color, bg_color, text_color)
@@ -185,7 +386,7 @@ class UITextBox(UIControl):
             
         self.align_offset = 0
         if self.w > 0:
-            text_width_pixels = (len(self.text) * _font.font.max_width())
+            text_width_pixels = text_width(_font, self.text)
             if text_width_pixels + self.bd_clearance >= self.w:
                 print('WARNING - text too long for TextBox')
                 print('text width pixels plus boarder clear:',text_width_pixels + self.bd_clearance + 1)
@@ -210,27 +411,37 @@ class UITextBox(UIControl):
         return False
 
     def set_text(self, text):
+        self.post(text)
+
+    def apply(self, text):
         self.text = text
-        if self.manager.current_screen == self.assigned_screen:
-            self.draw()
+        self.refresh()
             
 # ------------------------------------------------------------
 class UITextOnly(UIControl):
+    touchable = False
+
     def __init__(self, start_x=5, start_y=10, inc_y=20):
+        super().__init__(start_x, start_y, 0, 0)
         self.text_list = []
         self.start_x = start_x
         self.start_y = start_y
         self.inc_y = inc_y
         
+    def bounds(self):
+        bottom = self.y
+        for item in self.text_list:
+            bottom = max(bottom, item[2] + item[3].height)
+        return (self.x, self.y, SCREEN_WIDTH - self.x, bottom - self.y)
+
     def draw(self):
         for item in self.text_list:
-            print_text(self.manager.buf, item[3], item[0], item[1], item[2], item[4], self.manager.screens[self.manager.current_screen]['bg_color'])
+            print_text(self.manager.buf, item[3], item[0], item[1], item[2], item[4], self.get_back_color())
              
     def set_text(self, text, font, text_color):
         self.text_list.append((text, self.start_x, self.start_y, font, text_color))
         self.start_y += self.inc_y
-        if self.manager.current_screen == self.assigned_screen:
-            self.draw()
+        self.invalidate()
 
 
 # ------------------------------------------------------------
@@ -253,7 +464,7 @@ class UIButton(UIControl):
 
         _font = self.font if self.font is not None else self.manager.font
         
-        tw = len(self.text) * _font.font.max_width()
+        tw = text_width(_font, self.text)
         tx = self.x + (self.w - tw) // 2
         ty = self.y + (self.h - _font.height) // 2
         print_text(self.manager.buf, _font, self.text, tx, ty, textcol, self.get_back_color())
@@ -271,16 +482,19 @@ class UIButton(UIControl):
         return False
 
     def set_text(self, text):
+        self.post(text)
+
+    def apply(self, text):
         self.text = text
-        if self.manager.current_screen == self.assigned_screen:
-            self.draw()
+        self.refresh()
   
 # ------------------------------------------------------------
 class UISlider(UIControl):
     """A horizontal slider for selecting a value."""
     def __init__(self, x, y, w, h, min_val=0, max_val=100,
                  value=0, callback=None,
-                 track_color=0xFFFF, knob_color=0xFFFF, bg_color=0x0000):
+                 track_color=0xFFFF, knob_color=0xFFFF, bg_color=0x0000,
+                 callback_ms=0, callback_on_release=False):
         super().__init__(x, y, w, h, "", callback,
                          track_color, bg_color, track_color)
         self.min = min_val
@@ -288,6 +502,12 @@ class UISlider(UIControl):
         self.value = value
         self.knob_color = knob_color
         self.dragging = False
+        # While dragging call back at most every callback_ms (0: on every
+        # change), or with callback_on_release only when the finger lifts
+        self.callback_ms = callback_ms
+        self.callback_on_release = callback_on_release
+        self.cb_value = value  # value the callback last reported
+        self.cb_time = 0
 
     def draw(self):
         if self.manager is None:
@@ -304,24 +524,43 @@ class UISlider(UIControl):
 
     def process_touch(self, evt: TouchEvent):
         #print(f"UISlider touch at ({evt.x},{evt.y}) type={evt.type} within bounds {self.within_bounds(evt.x, evt.y)}" )
-        if evt.type in (TOUCH_TAP, TOUCH_DRAG) and self.within_bounds(evt.x, evt.y):
+        # once grabbed the knob follows the finger even if it strays off the track
+        if (evt.type == TOUCH_DRAG and self.dragging) or (
+                evt.type in (TOUCH_TAP, TOUCH_DRAG) and self.within_bounds(evt.x, evt.y)):
             rel = (evt.x - self.x) / float(self.w - 1 if self.w > 1 else 1)
             rel = max(0, min(1, rel))
             self.value = self.min + rel * (self.max - self.min)
-            self.dragging = True
-            self.draw()
-            if self.callback:
-                self.callback(self.value)
+            self.dragging = evt.type == TOUCH_DRAG
+            self.refresh()
+            self.notify(not self.dragging)
             return True
         if evt.type == TOUCH_DRAG_END and self.dragging:
             self.dragging = False
-            self.draw()
+            self.refresh()
+            self.notify(True)
             return True
         return False
 
+    def notify(self, final):
+        """Report a changed value to the callback, throttled while dragging.
+        final is True when the touch is over, so the last value always lands."""
+        if self.callback is None or self.value == self.cb_value:
+            return
+        now = ticks_ms()
+        if not final and (self.callback_on_release or
+                          (self.callback_ms and ticks_diff(now, self.cb_time) < self.callback_ms)):
+            return
+        self.cb_value = self.value
+        self.cb_time = now
+        self.callback(self.value)
+
     def set_value(self, val):
+        self.post(val)
+
+    def apply(self, val):
         self.value = max(self.min, min(self.max, val))
-        self.draw()
+        self.cb_value = self.value
+        self.refresh()
 
 # ------------------------------------------------------------
 class UICheckBox(UIControl):
@@ -334,6 +573,13 @@ class UICheckBox(UIControl):
         self.checked = checked
         self.check_color = check_color
 
+    def bounds(self):
+        # the label is printed to the right of the box
+        _font = self.get_font()
+        ly = (self.h - 8) // 2
+        w = self.w + 6 + text_width(_font, self.text)
+        return (self.x, self.y, w, max(self.h, ly + _font.height))
+
     def draw(self):
         if self.manager is None:
             return
@@ -355,28 +601,42 @@ class UICheckBox(UIControl):
             print_text(self.manager.buf, self.manager.font, self.text, self.x + self.w + 6, ly, self.text_color, self.bg_color)
         # buf.text(self.value, self.x + self.w + 6, ly, self.text_color)
 
+    def touch_bounds(self):
+        return (self.x, self.y, self.w + 6, self.h)
+
     def process_touch(self, evt: TouchEvent):
         #print(f"UICheckBox '{self.value}' touch at ({evt.x},{evt.y}) type={evt.type}")
         #ext_w = self.w + 6 + len(self.text) * 8
         ext_w = self.w + 6
         if evt.type == TOUCH_TAP and self.within_bounds(evt.x, evt.y, ext_w, self.h):
             self.checked = not self.checked
-            self.draw()
+            self.refresh()
             if self.callback:
                 self.callback(self.checked)
             return True
         return False
 
     def set_checked(self, checked):
+        self.post(checked)
+
+    def apply(self, checked):
         self.checked = checked
-        self.draw()
+        self.refresh()
 
 
 # ------------------------------------------------------------------
 class UIDial(UIControl):
+    touchable = False
+
+    # Legend offsets (upper angle, dx, dy) moving each label's top left corner
+    # so the text sits centred on its compass point
+    LEGEND_OFFSETS = ((22.5, -5, 0), (45, -5, -3), (112.5, -8, -8), (157.5, -5, -8),
+                      (180, -5, -12), (202.5, -8, -12), (247.5, -8, -8), (270, -12, -8),
+                      (315, -8, -8), (337.5, -12, -3), (360, -8, 0))
+
     def __init__(self,x,y,radius, smallticks=0, bigticks=0, face_color = GREY, bg_color=None, fg_color=GREEN, smallticks_color=WHITE,
                  bigticks_color=WHITE, needle_color=RED, boss_color=PINK, text_color=None, chr_list=None):
-        super().__init__(x, y, fg_color, bg_color, text_color)
+        super().__init__(x, y, 0, 0, None, None, fg_color, bg_color, text_color)
         self.x = x
         self.y = y
         self.smallticks = smallticks
@@ -393,126 +653,197 @@ class UIDial(UIControl):
         self.boss_size = int(radius * 0.1)
         self.needle_value = None
         self.chr_list = chr_list
+        # tick end points and legend positions, rebuilt when the geometry changes
+        self.geometry_key = None
+        self.smalltick_ends = None
+        self.bigtick_ends = None
+        self.legend = None
+        # save-under copy of the face below the needle, see _needle_buffers()
+        self.under = None
+        self.under_radius = None  # radius the needle geometry was built for
+        self.under_saved = False
+        self.under_x = 0
+        self.under_y = 0
+        self.needle_length = 0
+        self.needle_margin = 0
+        self.needle_q = None  # quarter degree angle of the needle on screen
+        self.needle_poly = array.array('h', bytearray(20))
         
     def _target_coords(self,ox,oy,radius,angle):
-        x = radius * math.sin(math.radians(angle))
-        y = radius * math.cos(math.radians(angle))
-        #return(int(round(x,0)) + ox, (int(round(y,0)) - oy) *-1)
-        return(int(round(x,0)) + ox, oy - (int(round(y,0))))
+        return polar_point(ox, oy, radius, angle)
+
+    def _tick_ends(self, count):
+        ends = array.array('h', bytearray(4 * count))
+        for i in range(count):
+            ends[2 * i], ends[2 * i + 1] = polar_point(self.x, self.y, self.radius, i * 360 / count)
+        return ends
+
+    def _geometry(self):
+        # recompute the cached tick and legend positions only when something
+        # they depend on has changed
+        _font = self.get_font()
+        key = (self.x, self.y, self.radius, self.smallticks, self.bigticks, self.chr_list, _font)
+        if key == self.geometry_key:
+            return
+        self.smalltick_ends = self._tick_ends(self.smallticks) if self.smallticks > 0 else None
+        self.bigtick_ends = self._tick_ends(self.bigticks) if self.bigticks > 0 else None
+        self.legend = None
+        if self.chr_list:
+            self.legend = []
+            segment = 360 / len(self.chr_list)
+            for i, c in enumerate(self.chr_list):
+                angle = i * segment
+                tx, ty = polar_point(self.x, self.y, self.radius + 20, angle)
+                for limit, dx, dy in self.LEGEND_OFFSETS:
+                    if angle <= limit:
+                        tx += dx
+                        ty += dy
+                        break
+                self.legend.append((c, tx, ty))
+        self.geometry_key = key
+
+    def bounds(self):
+        # x, y is the centre; the legend is printed outside the face
+        reach = self.radius + 1
+        if self.chr_list:
+            _font = self.get_font()
+            widest = max(text_width(_font, c) for c in self.chr_list)
+            reach += 20 + 12 + max(widest, _font.height)
+        return (self.x - reach, self.y - reach, 2 * reach + 1, 2 * reach + 1)
     
     def draw(self):
+        self._geometry()
+        buf = self.manager.buf
         # face
-        self.manager.buf.ellipse(self.x,self.y,self.radius,self.radius,self.face_color, True)
-        self.manager.buf.ellipse(self.x,self.y,self.radius,self.radius,self.fg_color)
+        buf.ellipse(self.x,self.y,self.radius,self.radius,self.face_color, True)
+        buf.ellipse(self.x,self.y,self.radius,self.radius,self.fg_color)
         
         # small ticks
-        if self.smallticks > 0:
-            angle = 0
-            segment = 360 / self.smallticks
-            while angle < 360:
-                tx, ty = self._target_coords(self.x,self.y,self.radius,angle)
-                self.manager.buf.line(self.x,self.y,tx,ty,self.smallticks_color)
-                angle += segment
-                center_clear = int(self.radius * 0.1)
-            self.manager.buf.ellipse(self.x,self.y,self.radius-center_clear,self.radius-center_clear,self.face_color, True)
+        ends = self.smalltick_ends
+        if ends is not None:
+            for i in range(0, len(ends), 2):
+                buf.line(self.x,self.y,ends[i],ends[i + 1],self.smallticks_color)
+            center_clear = int(self.radius * 0.1)
+            buf.ellipse(self.x,self.y,self.radius-center_clear,self.radius-center_clear,self.face_color, True)
         
         # big ticks
-        if self.bigticks > 0:
-            angle = 0
-            segment = 360 / self.bigticks
-            while angle < 360:
-                tx, ty = self._target_coords(self.x,self.y,self.radius,angle)
-                self.manager.buf.line(self.x,self.y,tx,ty,self.bigticks_color)
-                angle += segment
-                center_clear = int(self.radius * 0.2)   
-            self.manager.buf.ellipse(self.x,self.y,self.radius-center_clear,self.radius-center_clear,self.face_color, True)
+        ends = self.bigtick_ends
+        if ends is not None:
+            for i in range(0, len(ends), 2):
+                buf.line(self.x,self.y,ends[i],ends[i + 1],self.bigticks_color)
+            center_clear = int(self.radius * 0.2)
+            buf.ellipse(self.x,self.y,self.radius-center_clear,self.radius-center_clear,self.face_color, True)
        
         # dial boss
         self.manager.buf.ellipse(self.x,self.y,self.boss_size,self.boss_size,self.boss_color, True)
         
+        # the face has been repainted so any saved needle background is stale
+        self.under_saved = False
+        self.needle_q = None
+
         # show dial if legend charaters are provided
         if self.chr_list is not None:
             self.show_txt(self.chr_list)    
     
         # draw needle if needle has a current value stored
         if self.needle_value is not None:
-            self.set_value(self.needle_value)
+            self.update()
             
-    # set the value (0 - 360) of dial circle - calculate the needle angel and draw the needle
+    # set the value (0 - 360) of dial circle - the needle is redrawn by the manager
     # if the control is on the current screen
     def set_value(self, angle):
+        self.post(angle)
+
+    def apply(self, angle):
         self.needle_value = angle
-        if self.manager.current_screen != self.assigned_screen:
-            return
-        # calculate the needle angle
-        needle_length = int(self.radius * 0.7)
-        # blank previous
-        center_clear = int(self.radius * 0.2)  
-        self.manager.buf.ellipse(self.x,self.y,self.radius-center_clear,self.radius-center_clear,self.face_color, True)
-        # sharp end of needle
-        tx, ty = self._target_coords(self.x,self.y,needle_length,angle)
-        
+        self.refresh()
+
+    def _needle_buffers(self):
+        # The needle always lies in the quadrant of its angle plus a margin for
+        # the needle width and the boss, so one square of side length + margin
+        # anchored at the centre holds everything it can cover. Built once
+        # per radius; the update path only reads it.
+        if self.under_radius == self.radius:
+            return
+        needle_length = self.radius * 7 // 10
+        margin = max(self.boss_size, (needle_length * 7) // 100 + 2) + 1
+        size = needle_length + margin + 1
+        self.under = framebuf.FrameBuffer(bytearray(size * size * 2), size, size, framebuf.RGB565)
+        self.under_radius = self.radius
+        self.under_saved = False
+        self.needle_length = needle_length
+        self.needle_margin = margin
+
+    def _needle_point(self, i, length, q):
+        # store the point at length and quarter degree angle q in needle_poly[i:i+2]
+        table = sin_table()
+        q %= TRIG_STEPS
+        half = 1 << (TRIG_SHIFT - 1)
+        self.needle_poly[i] = self.x + ((length * table[q] + half) >> TRIG_SHIFT)
+        self.needle_poly[i + 1] = self.y - ((length * table[(q + TRIG_STEPS // 4) % TRIG_STEPS] + half) >> TRIG_SHIFT)
+
+    # draw the needle at needle_value, restoring the face under the previous
+    # needle first instead of repainting the centre of the dial
+    def update(self):
+        angle = self.needle_value
+        if angle is None:
+            return
+        # integer angles stay integers, so the frame path makes no floats
+        if isinstance(angle, int):
+            q = angle * 4 % TRIG_STEPS
+        else:
+            q = int(angle * 4 + 0.5) % TRIG_STEPS
+        if q == self.needle_q:
+            return
+        buf = self.manager.buf
+        self._needle_buffers()
+        needle_length = self.needle_length
+        margin = self.needle_margin
+        # put back what the previous needle covered
+        if self.under_saved:
+            buf.blit(self.under, self.under_x, self.under_y)
+        # save what the new needle will cover
+        quadrant = q // (TRIG_STEPS // 4)
+        self.under_x = self.x - margin if quadrant < 2 else self.x - needle_length
+        self.under_y = self.y - margin if quadrant in (1, 2) else self.y - needle_length
+        self.under.blit(buf, -self.under_x, -self.under_y)
+        self.under_saved = True
+        self.needle_q = q
+
         # thin needle
         #self.manager.buf.line(self.x,self.y,tx,ty,self.needle_color)
         
-        # fat needle
-        sx, sy = self._target_coords(self.x,self.y,int(needle_length-10),angle-4)
-        lx, ly = self._target_coords(self.x,self.y,int(needle_length-10),angle+4)
-        fat_needle = array.array('h',[tx,ty,sx, sy, self.x, self.y, lx, ly, tx, ty])
-        self.manager.buf.poly(0,0,fat_needle, self.needle_color, True)
-
+        # fat needle: sharp end, side, centre, other side, back to the sharp end
+        poly = self.needle_poly
+        self._needle_point(0, needle_length, q)
+        self._needle_point(2, needle_length - 10, q - 16)
+        poly[4] = self.x
+        poly[5] = self.y
+        self._needle_point(6, needle_length - 10, q + 16)
+        poly[8] = poly[0]
+        poly[9] = poly[1]
+        buf.poly(0, 0, poly, self.needle_color, True)
         
         # dial boss
-        self.manager.buf.ellipse(self.x,self.y,self.boss_size,self.boss_size,self.boss_color, True)    
+        buf.ellipse(self.x,self.y,self.boss_size,self.boss_size,self.boss_color, True)    
 
     # display compass ledgend
     def show_txt(self,chr_list):
-        _font = self.font if self.font is not None else self.manager.font
-        num = len(chr_list)
-        segment = 360 / num
-        angle = 0
-        for c in chr_list:
-            pad = 20
-            tx,ty = self._target_coords(self.x,self.y,self.radius+pad,angle)
-            if angle >=0 and angle <= 22.5:
-                tx -= 5
-            elif angle >22.5 and angle <=45:
-                tx -= 5
-                ty -= 3
-            elif angle >45 and angle <=112.5:
-                tx -= 8
-                ty -=8
-            elif angle >112.5 and angle <=157.5:
-                tx -= 5
-                ty -= 8
-            elif angle >157.5 and angle <=180:
-                tx -= 5
-                ty -= 12
-            elif angle >180 and angle <=202.5:
-                tx -= 8
-                ty -= 12
-            elif angle >202.5 and angle <=247.5:
-                tx -= 8
-                ty -= 8
-            elif angle >247.5 and angle <=270:
-                tx -= 12
-                ty -= 8
-            elif angle >270 and angle <=315:
-                tx -= 8
-                ty -= 8
-            elif angle >315 and angle <=337.5:
-                tx -= 12
-                ty -= 3
-            elif angle >337.5 and angle <=360:
-                tx -= 8 
-  
-            print_text(self.manager.buf, _font, c, tx, ty, self.text_color, self.get_back_color())
-            angle += segment
+        self.chr_list = chr_list
+        self._geometry()
+        if not self.legend:
+            return
+        _font = self.get_font()
+        back_color = self.get_back_color()
+        for c, tx, ty in self.legend:
+            print_text(self.manager.buf, _font, c, tx, ty, self.text_color, back_color)
 
 
 # ------------------------------------------------------------
 class UIProgressBar(UIControl):
     """A non-interactive progress bar."""
+    touchable = False
+
     def __init__(self, x, y, w, h, min_val=0, max_val=100,
                  value=0, track_color=0xFFFF,
                  fill_color=0xFFFF, bg_color=0x0000):
@@ -535,9 +866,11 @@ class UIProgressBar(UIControl):
         self.manager.buf.rect_round(self.x, self.y, self.w, self.h, 5, self.fg_color)
 
     def set_value(self, val):
+        self.post(val)
+
+    def apply(self, val):
         self.value = max(self.min, min(self.max, val))
-        if self.manager.current_screen == self.assigned_screen:
-            self.draw()
+        self.refresh()
 
 
 # Controls Manager **********************************************
@@ -548,22 +881,74 @@ class UIManager:
         the frame buffer instance and a program default font.
         All the screens are held in a dictionary with a screen name : sub dictionary
         arrangement with the sub dictionary holding a background colour for the screen
-        and another sub dictionary holding a list of controls assigned to the screen name"""
+        and another sub dictionary holding a list of controls assigned to the screen name
+        Optionally fully rendered copies of recently shown screens can be kept
+        off screen (see enable_screen_cache) so switching back is a single copy"""
     
     def __init__(self, buf, def_font):
-        self.buf = buf
+        self.buf = buf  # surface being painted, normally the display
+        self.display = buf  # surface the current screen is painted into
+        self.front = buf  # surface being scanned out, see enable_page_flip
+        self.present = None
+        self.back_index = 0
+        self.painting = False  # a page flipped frame is being painted
+        self.frame_rects = []  # rectangles painted in this frame
+        self.carry = []  # rectangles the back buffer is missing
+        self.carry_all = False
+        self.frame_all = False
         self.screens = {}
         self.current_screen = None
         self.font = def_font
+        self.screen_cache = {}  # screen name : [surface, last use, holds the screen]
+        self.cache_screens = 0  # max number of cached screens, 0 disables the cache
+        self.cache_min_free = 0
+        self.cache_clock = 0
+        self.restored = False  # set_screen showed a cached copy of the screen
+        self.pending = {}  # control : latest value posted since the last frame
+        self.rendering = False  # True while the render task is running
+        self.repaint_all = False  # draw_all requested from within a frame
+        self.frames_painted = 0  # repaints of the current screen so far
+        self.frame_ms = 1000 // FRAME_RATE
+        self.touch_owner = None  # control that consumed the current tap/drag
+        self.touch_queue = []  # touches posted for the next frame, see post_touch
+        self.drags_coalesced = 0
+        self.grid_cols = (SCREEN_WIDTH + TOUCH_GRID_CELL - 1) // TOUCH_GRID_CELL
+        self.grid_rows = (SCREEN_HEIGHT + TOUCH_GRID_CELL - 1) // TOUCH_GRID_CELL
 
     def add_screen(self, name, bg_color):
-        self.screens.update({name : {'bg_color': bg_color, 'controls':[]}})
+        # 'grid' holds, per touch cell, the controls whose padded touch bounds
+        # cover that cell (None for empty cells). 'dirty' holds the merged
+        # rectangles and 'stale' the controls awaiting update() of the screen.
+        self.screens.update({name : {'bg_color': bg_color, 'controls':[],
+                                     'grid': [None] * (self.grid_cols * self.grid_rows),
+                                     'dirty': [], 'stale': []}})
         if self.current_screen is None:
             self.current_screen = name
             
     def set_screen(self, name):
         if name in self.screens:
-            self.current_screen = name
+            old = self.current_screen
+            if old is not None and old != name:
+                self._capture(old)
+            entry = self.screen_cache.get(name)
+            if old != name and entry is not None and entry[2]:
+                # bring the cached copy up to date and show it in one copy;
+                # from now on the display holds the screen
+                self._redraw_screen(name)
+                self.current_screen = name
+                self._begin_frame(True)
+                self.frames_painted += 1
+                pixel_view(self.display)[:] = pixel_view(entry[0])
+                self._end_frame(True)
+                entry[1] = self._tick()
+                entry[2] = False
+                self.restored = True
+            else:
+                self.current_screen = name
+                self.screens[name]['dirty'] = []
+                self.screens[name]['stale'] = []
+                self.restored = False
+            self.touch_owner = None
         else:
             print('error - screen name not in screen list')
             
@@ -573,21 +958,391 @@ class UIManager:
                 self.screens[screen_name]['controls'].append(ctrl_obj)
                 ctrl_obj.manager = self
                 ctrl_obj.assigned_screen = screen_name
+                self._index_control(self.screens[screen_name]['grid'], ctrl_obj)
             else:
                 print('contol already assinged to screen')
         else:
             print('error - screen_name not in screen list')
             
+    def _index_control(self, grid, ctrl):
+        # add ctrl to every cell its padded touch bounds cover; controls are
+        # indexed in screen order so each cell keeps the screen's precedence
+        if not ctrl.touchable:
+            return
+        x, y, w, h = ctrl.touch_bounds()
+        cell = TOUCH_GRID_CELL
+        c0 = max(0, (x - TOUCH_PADDING) // cell)
+        c1 = min(self.grid_cols - 1, (x + w + TOUCH_PADDING - 1) // cell)
+        r0 = max(0, (y - TOUCH_PADDING) // cell)
+        r1 = min(self.grid_rows - 1, (y + h + TOUCH_PADDING - 1) // cell)
+        for row in range(r0, r1 + 1):
+            for col in range(c0, c1 + 1):
+                i = row * self.grid_cols + col
+                if grid[i] is None:
+                    grid[i] = [ctrl]
+                else:
+                    grid[i].append(ctrl)
+
+    def reindex(self, screen_name):
+        """Rebuild the touch index of a screen, e.g. after moving controls."""
+        screen = self.screens[screen_name]
+        grid = screen['grid']
+        for i in range(len(grid)):
+            grid[i] = None
+        for ctrl in screen['controls']:
+            self._index_control(grid, ctrl)
+
+    def geometry_changed(self, ctrl):
+        if ctrl.assigned_screen is not None:
+            self.reindex(ctrl.assigned_screen)
+
+    def invalidate(self, rect, screen_name=None):
+        """Mark a rectangle of a screen (default the current one) for repaint.
+        Overlapping rectangles are merged so each area is only repainted once."""
+        x, y, w, h = rect
+        if x < 0:
+            w += x
+            x = 0
+        if y < 0:
+            h += y
+            y = 0
+        w = min(w, SCREEN_WIDTH - x)
+        h = min(h, SCREEN_HEIGHT - y)
+        if w <= 0 or h <= 0:
+            return
+        dirty = self.screens[screen_name or self.current_screen]['dirty']
+        rect = (x, y, w, h)
+        i = 0
+        while i < len(dirty):
+            if rect_intersects(rect, dirty[i]):
+                rect = rect_union(rect, dirty.pop(i))
+                i = 0
+            else:
+                i += 1
+        dirty.append(rect)
+
+    def invalidate_control(self, ctrl):
+        # controls on screens that are neither shown nor cached are painted
+        # when their screen is next drawn
+        name = ctrl.assigned_screen
+        if self._surface(name) is None:
+            return
+        if ctrl.painted_rect is not None:
+            self.invalidate(ctrl.painted_rect, name)
+        self.invalidate(ctrl.bounds(), name)
+
+    def refresh_control(self, ctrl):
+        name = ctrl.assigned_screen
+        if self._surface(name) is None:
+            return
+        stale = self.screens[name]['stale']
+        if ctrl not in stale:
+            stale.append(ctrl)
+
+    def _paint(self, ctrl):
+        ctrl.draw()
+        ctrl.painted_rect = ctrl.bounds()
+
+    def redraw(self):
+        """Repaint the dirty areas of the current screen, and of any cached
+        hidden screens, in one pass each."""
+        for name in self.screen_cache:
+            if name != self.current_screen:
+                self._redraw_screen(name)
+        if self.current_screen is not None:
+            self._redraw_screen(self.current_screen)
+            self._end_frame()
+
+    def _redraw_screen(self, name):
+        # clear the merged rectangles, redraw the controls intersecting them,
+        # then update the controls that only changed value
+        screen = self.screens[name]
+        if not (screen['dirty'] or screen['stale']):
+            return
+        surface = self._surface(name)
+        if surface is None:
+            screen['dirty'] = []
+            screen['stale'] = []
+            return
+        current = name == self.current_screen
+        if current:
+            self._begin_frame()
+            self.frames_painted += 1
+        self.buf = surface
+        try:
+            dirty = screen['dirty']
+            repaint = set()
+            if dirty:
+                # a redrawn control paints its whole bounds, so grow the dirty
+                # area until it covers every control it touches
+                grown = True
+                while grown:
+                    grown = False
+                    for ctrl in screen['controls']:
+                        if ctrl in repaint:
+                            continue
+                        rect = ctrl.bounds()
+                        for area in dirty:
+                            if rect_intersects(rect, area):
+                                repaint.add(ctrl)
+                                self.invalidate(rect, name)
+                                grown = True
+                                break
+                for area in dirty:
+                    surface.rect(area[0], area[1], area[2], area[3], screen['bg_color'], True)
+                for ctrl in screen['controls']:
+                    if ctrl in repaint:
+                        self._paint(ctrl)
+            for ctrl in screen['stale']:
+                if ctrl not in repaint:
+                    ctrl.update()
+            if current and self.present is not None:
+                self.frame_rects.extend(dirty)
+                for ctrl in screen['stale']:
+                    self.frame_rects.append(ctrl.painted_rect or ctrl.bounds())
+        finally:
+            self.buf = self.display
+            screen['dirty'] = []
+            screen['stale'] = []
+
     def draw_all(self):
         if self.current_screen is None:
             return
-        self.buf.fill(self.screens[self.current_screen]['bg_color'])
-        for ctrl in self.screens[self.current_screen]['controls']:
-            ctrl.draw()
+        # while the render task runs the full repaint happens on the next frame
+        if self.rendering:
+            self.repaint_all = True
+            return
+        self._draw_all()
+
+    def _draw_all(self):
+        self.repaint_all = False
+        screen = self.screens[self.current_screen]
+        if self.restored:
+            # set_screen already copied the cached screen to the display
+            self.restored = False
+            self._redraw_screen(self.current_screen)
+            self._end_frame()
+            return
+        self._begin_frame(True)
+        self.frames_painted += 1
+        self.display.fill(screen['bg_color'])
+        for ctrl in screen['controls']:
+            self._paint(ctrl)
+        screen['dirty'] = []
+        screen['stale'] = []
+        self._end_frame(True)
+
+    # Page flipping *********************************************************
+
+    def enable_page_flip(self, back_buf, present):
+        """Draw into a second frame buffer and flip instead of painting the
+        buffer being scanned out, so partly drawn frames are never visible.
+        back_buf is a WriterDevice over the second buffer; present(index)
+        makes buffer index (0 = the manager's original buffer, 1 = back_buf)
+        the one being scanned out, e.g. squixl.show_buffer.
+        After a flip only the rectangles painted in the last frame are copied
+        forward to keep the new back buffer in step."""
+        self.surfaces = (self.front, back_buf)
+        self.present = present
+        self.back_index = 1
+        self.display = back_buf
+        self.buf = back_buf
+        self.carry = []
+        self.carry_all = True
+
+    def _begin_frame(self, full=False):
+        # bring the back buffer up to date before painting into it
+        if self.present is None or self.painting:
+            return
+        self.painting = True
+        if not full:
+            if self.carry_all:
+                pixel_view(self.display)[:] = pixel_view(self.front)
+            else:
+                for rect in self.carry:
+                    copy_rect(self.display, self.front, rect)
+        self.carry = []
+        self.carry_all = False
+        self.frame_rects = []
+        self.frame_all = full
+
+    def _end_frame(self, full=False):
+        # flip the painted back buffer to the front
+        if not self.painting:
+            return
+        self.painting = False
+        self.present(self.back_index)
+        self.back_index ^= 1
+        self.front = self.display
+        self.display = self.surfaces[self.back_index]
+        self.buf = self.display
+        self.carry = self.frame_rects
+        self.carry_all = full or self.frame_all
+        self.frame_rects = []
+
+    # Off screen cache of rendered screens ***********************************
+
+    def enable_screen_cache(self, max_screens=2, min_free=256 * 1024):
+        """Keep up to max_screens fully rendered screens (SCREEN_WIDTH x
+        SCREEN_HEIGHT RGB565 each) off screen. A screen is captured when it is
+        left, kept up to date while hidden and copied back in one go by
+        draw_all(). The least recently shown copies are dropped when the
+        limit is reached or the free heap would fall below min_free bytes.
+        max_screens=0 disables the cache and frees the copies."""
+        self.cache_screens = max_screens
+        self.cache_min_free = min_free
+        while len(self.screen_cache) > max_screens:
+            self._evict()
+        gc.collect()
+
+    def _tick(self):
+        self.cache_clock += 1
+        return self.cache_clock
+
+    def _surface(self, name):
+        # where a screen's pixels live: the display for the current screen,
+        # its cached copy when hidden, or None when it is not held anywhere
+        if name == self.current_screen:
+            return self.display
+        entry = self.screen_cache.get(name)
+        if entry is not None and entry[2]:
+            return entry[0]
+        return None
+
+    def _evict(self):
+        oldest = None
+        for name, entry in self.screen_cache.items():
+            if name != self.current_screen and (oldest is None or entry[1] < oldest_use):
+                oldest = name
+                oldest_use = entry[1]
+        if oldest is None:
+            return False
+        del self.screen_cache[oldest]
+        return True
+
+    def _capture(self, name):
+        # copy the screen being left into its off screen surface
+        if not self.cache_screens:
+            return
+        self._redraw_screen(name)
+        self._end_frame()
+        entry = self.screen_cache.get(name)
+        if entry is None:
+            nbytes = SCREEN_WIDTH * SCREEN_HEIGHT * 2
+            while len(self.screen_cache) >= self.cache_screens:
+                if not self._evict():
+                    return
+            gc.collect()
+            while gc.mem_free() < nbytes + self.cache_min_free:
+                if not self._evict():
+                    return
+                gc.collect()
+            try:
+                entry = [WriterDevice(bytearray(nbytes)), 0, False]
+            except MemoryError:
+                return
+            self.screen_cache[name] = entry
+        pixel_view(entry[0])[:] = pixel_view(self.front)
+        entry[1] = self._tick()
+        entry[2] = True
+
+    def set_frame_rate(self, fps):
+        self.frame_ms = 1000 // max(1, fps)
+
+    def apply_pending(self):
+        """Apply the latest value posted to each control since the last frame."""
+        if not self.pending:
+            return
+        pending = self.pending
+        self.pending = {}
+        for ctrl, value in pending.items():
+            ctrl.apply(value)
+
+    def post_touch(self, evt: TouchEvent):
+        """Queue a touch for the next frame. A drag (or pinch) replaces one
+        queued just before it, so however fast the panel reports, a drag is
+        handled at most once per frame. Outside the render task the touch is
+        processed straight away."""
+        if not self.rendering:
+            self.process_touch(evt)
+            return
+        queue = self.touch_queue
+        if (evt.type in (TOUCH_DRAG, TOUCH_PINCH, TOUCH_TWO_DRAG)
+                and queue and queue[-1].type == evt.type):
+            queue[-1] = evt
+            self.drags_coalesced += 1
+        else:
+            queue.append(evt)
+
+    def flush_touches(self):
+        """Process the queued touches in order."""
+        if not self.touch_queue:
+            return
+        queue = self.touch_queue
+        self.touch_queue = []
+        for evt in queue:
+            self.process_touch(evt)
+
+    def render_frame(self):
+        self.flush_touches()
+        self.apply_pending()
+        if self.repaint_all:
+            self._draw_all()
+        else:
+            self.redraw()
+
+    async def render(self, fps=None):
+        """Render task: once per frame apply the posted values and repaint what
+        changed, then sleep for the rest of the frame so touch and network
+        tasks always get to run.
+        e.g. asyncio.create_task(mgr.render(fps=20))"""
+        if fps is not None:
+            self.set_frame_rate(fps)
+        self.rendering = True
+        try:
+            while True:
+                start = ticks_ms()
+                self.render_frame()
+                await asyncio.sleep_ms(max(0, self.frame_ms - ticks_diff(ticks_ms(), start)))
+        finally:
+            # keep the posted values; later changes apply immediately again
+            self.rendering = False
+            self.flush_touches()
+            self.apply_pending()
   
     def process_touch(self, evt: TouchEvent):
+        """Offer the event to the controls of the current screen whose touch
+        cell contains the event position; the first to consume it wins.
+        Drag and two finger events go to the control that took the start of
+        the touch first."""
+        if self.current_screen is None:
+            return False
+        owner = self.touch_owner
+        if owner is not None and evt.type in TOUCH_CONTINUED:
+            if evt.type in TOUCH_ENDS:
+                self.touch_owner = None
+            if owner.assigned_screen == self.current_screen and owner.process_touch(evt):
+                return True
+        x = evt.x
+        y = evt.y
+        if x < 0 or y < 0 or x >= SCREEN_WIDTH or y >= SCREEN_HEIGHT:
+            return False
+        cell = self.screens[self.current_screen]['grid'][
+            (y // TOUCH_GRID_CELL) * self.grid_cols + x // TOUCH_GRID_CELL]
+        if cell is None:
+            return False
+        for ctrl in cell:
+            if ctrl.process_touch(evt):
+                if evt.type in (TOUCH_TAP, TOUCH_DRAG, TOUCH_PINCH, TOUCH_TWO_DRAG):
+                    self.touch_owner = ctrl
+                return True
+        return False
+
+    def process_touch_linear(self, evt: TouchEvent):
+        """Reference linear scan over every control of the current screen,
+        kept for benchmarking against process_touch."""
         if self.current_screen is None:
-            return false
+            return False
         for ctrl in self.screens[self.current_screen]['controls']:
             if ctrl.process_touch(evt):
                 return True
@@ -0,0 +1,116 @@
+# textcache.py Implements the TextCache class.
+# A bounded cache of text runs pre-rendered to RGB565 so a label, button or
+# dial legend can be drawn with a single blit instead of one FrameBuffer and
+# two palette writes per glyph.
+
+# Released under the MIT License (MIT).
+
+import framebuf
+from uctypes import bytearray_at, addressof
+from boolpalette import BoolPalette
+
+
+# Advance widths per font, built once: font : (first char code, bytearray)
+_widths = {}
+
+def glyph_widths(font):
+    """Return (first char code, bytearray of advance widths) for a font module."""
+    table = _widths.get(font)
+    if table is None:
+        lo = font.min_ch() if hasattr(font, 'min_ch') else 32
+        hi = font.max_ch() if hasattr(font, 'max_ch') else 126
+        widths = bytearray(hi - lo + 1)
+        for i in range(len(widths)):
+            widths[i] = font.get_ch(chr(lo + i))[2]
+        table = (lo, widths)
+        _widths[font] = table
+    return table
+
+def text_width(writer, text):
+    """Width in pixels of text printed by a Writer; the same value as
+    Writer.stringlen() without the per character get_ch() calls."""
+    if not text:
+        return 0
+    font = writer.font
+    lo, widths = glyph_widths(font)
+    n = len(widths)
+    width = 0
+    for char in text:
+        i = ord(char) - lo
+        width += widths[i] if 0 <= i < n else font.get_ch(char)[2]
+    return width
+
+
+# Render text with a CWriter's font into a new RGB565 FrameBuffer.
+# Returns (framebuffer, width, height).
+def render_run(writer, text, fg_colour, bg_colour, palette=None):
+    font = writer.font
+    height = font.height()
+    width = text_width(writer, text)
+    run = framebuf.FrameBuffer(bytearray(width * height * 2), width, height, framebuf.RGB565)
+    if palette is None:
+        palette = BoolPalette(framebuf.RGB565)
+    palette.bg(bg_colour)
+    palette.fg(fg_colour)
+    col = 0
+    for char in text:
+        glyph, char_height, char_width = font.get_ch(char)
+        buf = bytearray_at(addressof(glyph), len(glyph))
+        fbc = framebuf.FrameBuffer(buf, char_width, char_height, writer.map)
+        run.blit(fbc, col, 0, -1, palette)
+        col += char_width
+    return run, width, height
+
+
+class TextCache:
+    """LRU cache of rendered text runs keyed by (writer, text, fg, bg).
+    max_bytes bounds the pixel data held; the least recently used runs are
+    dropped to make room."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._runs = {}  # key : [framebuffer, nbytes, last use]
+        self._clock = 0
+        self._palette = BoolPalette(framebuf.RGB565)
+
+    def get(self, writer, text, fg_colour, bg_colour):
+        """Return a FrameBuffer holding the rendered text."""
+        self._clock += 1
+        key = (writer, text, fg_colour, bg_colour)
+        entry = self._runs.get(key)
+        if entry is not None:
+            self.hits += 1
+            entry[2] = self._clock
+            return entry[0]
+        self.misses += 1
+        run, width, height = render_run(writer, text, fg_colour, bg_colour, self._palette)
+        nbytes = width * height * 2
+        if nbytes <= self.max_bytes:
+            while self.used_bytes + nbytes > self.max_bytes:
+                self._evict()
+            self._runs[key] = [run, nbytes, self._clock]
+            self.used_bytes += nbytes
+        return run
+
+    def _evict(self):
+        # drop the least recently used run
+        oldest = None
+        for key, entry in self._runs.items():
+            if oldest is None or entry[2] < oldest_use:
+                oldest = key
+                oldest_use = entry[2]
+        self.used_bytes -= self._runs.pop(oldest)[1]
+        self.evictions += 1
+
+    def clear(self):
+        self._runs = {}
+        self.used_bytes = 0
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'entries': len(self._runs), 'bytes': self.used_bytes,
+                'max_bytes': self.max_bytes}
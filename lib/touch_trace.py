@@ -0,0 +1,192 @@
+# touch_trace.py
+# Record GT911 touch samples to a compact binary trace and replay them
+# through the touch pipeline and a UIManager, measuring touch to pixel
+# latency.
+#
+# Trace format: the header b'SQTT' and a version byte, then one record per
+# read_points() call:
+#   <HB   ms since the previous record, number of points (0xFF: time only)
+#   <HHB  x, y, size for each point
+# A touch burst of 10 ms reports costs 8 bytes per sample.
+#
+# Record on the board by handing the reader a recorder in place of the driver:
+#   rec = TouchRecorder(squixl.touch, open('/sd/tap.trace', 'wb'))
+#   reader = TouchReader(rec)
+#   ...
+#   rec.close()
+# and replay with
+#   results = await replay('/sd/tap.trace', mgr, on_gesture)
+
+import struct
+import asyncio
+from time import ticks_ms, ticks_us, ticks_diff
+from squixl_touch import TouchReader, GestureRecognizer
+
+MAGIC = b'SQTT'
+VERSION = 1
+GAP = 0xFF              # point count of a record that only advances time
+MAX_DELTA = 0xFFFF
+FLUSH_BYTES = 512       # buffered before each write to flash / SD
+
+
+class TraceWriter:
+    """Appends samples to a trace stream, buffered to keep flash writes few."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.buf = bytearray(MAGIC)
+        self.buf.append(VERSION)
+        self.last = None
+        self.records = 0
+
+    def write(self, t, n, points):
+        if self.last is None:
+            self.last = t
+        delta = ticks_diff(t, self.last)
+        self.last = t
+        buf = self.buf
+        while delta > MAX_DELTA:
+            buf.extend(struct.pack('<HB', MAX_DELTA, GAP))
+            delta -= MAX_DELTA
+        n = min(n, 5)
+        buf.extend(struct.pack('<HB', max(0, delta), n))
+        for i in range(n):
+            p = points[i]
+            buf.extend(struct.pack('<HHB', p[0], p[1], min(p[2], 255)))
+        self.records += 1
+        if len(buf) >= FLUSH_BYTES:
+            self.flush()
+
+    def flush(self):
+        if self.buf:
+            self.stream.write(self.buf)
+            self.buf = bytearray()
+
+    def close(self):
+        self.flush()
+        self.stream.close()
+
+
+def read_trace(path):
+    """List of (t_ms, n, points) from a trace file, t from 0."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:4] != MAGIC or data[4] != VERSION:
+        raise ValueError('not a touch trace')
+    samples = []
+    t = 0
+    i = 5
+    while i + 3 <= len(data):
+        delta, n = struct.unpack_from('<HB', data, i)
+        i += 3
+        t += delta
+        if n == GAP:
+            continue
+        points = []
+        for _ in range(n):
+            points.append(struct.unpack_from('<HHB', data, i))
+            i += 5
+        samples.append((t, n, points))
+    return samples
+
+
+class TouchRecorder:
+    """Stands in for the touch driver, logging every read_points() result."""
+
+    def __init__(self, touch, stream):
+        self.touch = touch
+        self.writer = TraceWriter(stream)
+
+    def read_points(self):
+        n, points = self.touch.read_points()
+        self.writer.write(ticks_ms(), n, points)
+        return n, points
+
+    def clear_points(self):
+        self.touch.clear_points()
+
+    def close(self):
+        self.writer.close()
+
+
+async def replay(path, mgr, handler, speed=1, report=True):
+    """Feed a trace through TouchReader sampling, a GestureRecognizer calling
+    handler(evt) and mgr's frame loop, speed times faster than recorded
+    (0: as fast as possible). Frames fall on the same trace times whatever
+    the speed, so a replay is repeatable.
+    For every gesture event returns (type, contact_ms, sample_ms, frame_us):
+    the trace time from first contact and from the sample that caused it to
+    the end of the frame that repainted for it (None if nothing repainted),
+    and how long that frame took to render. Run it in place of mgr.render()."""
+    samples = read_trace(path)
+    results = []
+    waiting = []  # events that have not reached the screen yet
+
+    def on_event(evt):
+        waiting.append((evt.type, recognizer.t0, evt.t))
+        handler(evt)
+
+    reader = TouchReader(None, irq_pin=None)
+    recognizer = GestureRecognizer(on_event)
+    queue = reader.queue
+    frame_ms = mgr.frame_ms
+    start = ticks_ms()
+    now = samples[0][0] if samples else 0  # trace time
+    end = samples[-1][0] + 2 * frame_ms if samples else 0
+    i = 0
+    mgr.rendering = True
+    try:
+        while now <= end:
+            while i < len(samples) and samples[i][0] <= now:
+                t, n, points = samples[i]
+                reader.sample(n, points, t)
+                i += 1
+            while len(queue):
+                recognizer.feed(*queue.get_nowait())
+            recognizer.check_long(now)
+            painted = mgr.frames_painted
+            t0 = ticks_us()
+            mgr.render_frame()
+            frame_us = ticks_diff(ticks_us(), t0)
+            # the frame is on screen once rendered
+            done = now + frame_us // 1000
+            for kind, contact, sample in waiting:
+                if mgr.frames_painted != painted:
+                    results.append((kind, done - contact, done - sample, frame_us))
+                else:
+                    results.append((kind, None, None, frame_us))
+            waiting.clear()
+            now += frame_ms
+            # pace the replay: trace time runs speed times faster than real
+            # time, or as fast as frames render with speed=0
+            if speed:
+                lag = (now - samples[0][0]) // speed - ticks_diff(ticks_ms(), start)
+                await asyncio.sleep_ms(max(0, lag))
+            else:
+                await asyncio.sleep_ms(0)
+    finally:
+        mgr.rendering = False
+        mgr.flush_touches()
+        mgr.apply_pending()
+    if report:
+        print_report(results)
+    return results
+
+
+def print_report(results):
+    names = ('tap', 'double', 'long', 'swipe up', 'swipe right', 'swipe down',
+             'swipe left', 'drag', 'drag end', 'unknown', 'pinch', 'two drag',
+             'two end', 'two tap')
+    print('event        contact ms  sample ms  frame us')
+    lat = []
+    for kind, contact, sample, frame_us in results:
+        name = names[kind] if kind < len(names) else str(kind)
+        if contact is None:
+            print('{:<12} {:>10} {:>10} {:>9}'.format(name, '-', '-', frame_us))
+        else:
+            print('{:<12} {:>10} {:>10} {:>9}'.format(name, contact, sample, frame_us))
+            lat.append(sample)
+    if lat:
+        lat.sort()
+        print('events: {}  sample to pixel ms  median {}  max {}'.format(
+            len(results), lat[len(lat) // 2], lat[-1]))
@@ -0,0 +1,392 @@
+# framebuf.py Host side stand-in for the MicroPython framebuf module.
+# Pure Python port of the drawing algorithms in MicroPython's modframebuf.c
+# so UI code renders the same pixels off-device, plus the rect_round()
+# method of the SQUiXL firmware. Every pixel written is counted in
+# pixels_written for benchmarks.
+
+# Released under the MIT License (MIT).
+
+MONO_VLSB = 0
+MONO_HLSB = 3
+MONO_HMSB = 4
+RGB565 = 1
+GS2_HMSB = 5
+GS4_HMSB = 2
+GS8 = 6
+MVLSB = MONO_VLSB
+
+# ellipse() quadrant mask bits
+_Q1 = 0x01
+_Q2 = 0x02
+_Q3 = 0x04
+_Q4 = 0x08
+_FILL = 0x10
+
+pixels_written = 0  # running total of pixels set by any FrameBuffer
+
+
+def _count(n):
+    global pixels_written
+    pixels_written += n
+
+
+def _cdiv(a, b):
+    # C integer division (truncates towards zero)
+    q = abs(a) // abs(b)
+    return q if (a < 0) == (b < 0) else -q
+
+
+class FrameBuffer:
+    def __init__(self, buffer, width, height, format, stride=None):
+        if isinstance(buffer, FrameBuffer):
+            buffer = buffer.buffer
+        self.buffer = buffer
+        self._mv = memoryview(buffer).cast('B') if not isinstance(buffer, (bytes, bytearray)) else memoryview(buffer)
+        self.width = width
+        self.height = height
+        self.format = format
+        stride = width if stride is None else stride
+        if format in (MONO_HLSB, MONO_HMSB):
+            stride = (stride + 7) & ~7
+        elif format == GS2_HMSB:
+            stride = (stride + 3) & ~3
+        elif format == GS4_HMSB:
+            stride = (stride + 1) & ~1
+        self.stride = stride
+
+    # -- pixel access -------------------------------------------------------
+
+    def _get(self, x, y):
+        mv = self._mv
+        f = self.format
+        if f == RGB565:
+            i = (x + y * self.stride) * 2
+            return mv[i] | (mv[i + 1] << 8)
+        if f == MONO_HLSB:
+            i = (x + y * self.stride) >> 3
+            return (mv[i] >> (7 - (x & 7))) & 1
+        if f == MONO_HMSB:
+            i = (x + y * self.stride) >> 3
+            return (mv[i] >> (x & 7)) & 1
+        if f == MONO_VLSB:
+            return (mv[(y >> 3) * self.stride + x] >> (y & 7)) & 1
+        if f == GS8:
+            return mv[x + y * self.stride]
+        if f == GS4_HMSB:
+            i = (x + y * self.stride) >> 1
+            return (mv[i] >> 4) if x & 1 == 0 else mv[i] & 0x0F
+        if f == GS2_HMSB:
+            i = (x + y * self.stride) >> 2
+            return (mv[i] >> ((x & 3) << 1)) & 3
+        raise ValueError('invalid format')
+
+    def _set(self, x, y, c):
+        mv = self._mv
+        f = self.format
+        if f == RGB565:
+            i = (x + y * self.stride) * 2
+            mv[i] = c & 0xFF
+            mv[i + 1] = (c >> 8) & 0xFF
+        elif f == MONO_HLSB:
+            i = (x + y * self.stride) >> 3
+            b = 7 - (x & 7)
+            mv[i] = (mv[i] & ~(1 << b)) | ((c != 0) << b)
+        elif f == MONO_HMSB:
+            i = (x + y * self.stride) >> 3
+            b = x & 7
+            mv[i] = (mv[i] & ~(1 << b)) | ((c != 0) << b)
+        elif f == MONO_VLSB:
+            i = (y >> 3) * self.stride + x
+            b = y & 7
+            mv[i] = (mv[i] & ~(1 << b)) | ((c != 0) << b)
+        elif f == GS8:
+            mv[x + y * self.stride] = c & 0xFF
+        elif f == GS4_HMSB:
+            i = (x + y * self.stride) >> 1
+            if x & 1 == 0:
+                mv[i] = ((c & 0x0F) << 4) | (mv[i] & 0x0F)
+            else:
+                mv[i] = (mv[i] & 0xF0) | (c & 0x0F)
+        elif f == GS2_HMSB:
+            i = (x + y * self.stride) >> 2
+            s = (x & 3) << 1
+            mv[i] = (mv[i] & ~(3 << s)) | ((c & 3) << s)
+        else:
+            raise ValueError('invalid format')
+        _count(1)
+
+    def _set_checked(self, x, y, c, mask=True):
+        if mask and 0 <= x < self.width and 0 <= y < self.height:
+            self._set(x, y, c)
+
+    def _fill_rect(self, x, y, w, h, c):
+        # clipped fill
+        if h < 1 or w < 1 or x + w <= 0 or y + h <= 0 or y >= self.height or x >= self.width:
+            return
+        xend = min(self.width, x + w)
+        yend = min(self.height, y + h)
+        x = max(x, 0)
+        y = max(y, 0)
+        if self.format == RGB565:
+            row = bytes((c & 0xFF, (c >> 8) & 0xFF)) * (xend - x)
+            n = len(row)
+            mv = self._mv
+            step = self.stride * 2
+            i = (x + y * self.stride) * 2
+            for _ in range(yend - y):
+                mv[i:i + n] = row
+                i += step
+            _count((xend - x) * (yend - y))
+            return
+        for yy in range(y, yend):
+            for xx in range(x, xend):
+                self._set(xx, yy, c)
+
+    # -- public API ---------------------------------------------------------
+
+    def fill(self, c):
+        self._fill_rect(0, 0, self.width, self.height, c)
+
+    def fill_rect(self, x, y, w, h, c):
+        self._fill_rect(x, y, w, h, c)
+
+    def pixel(self, x, y, c=None):
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return None
+        if c is None:
+            return self._get(x, y)
+        self._set(x, y, c)
+
+    def hline(self, x, y, w, c):
+        self._fill_rect(x, y, w, 1, c)
+
+    def vline(self, x, y, h, c):
+        self._fill_rect(x, y, 1, h, c)
+
+    def rect(self, x, y, w, h, c, f=False):
+        if f:
+            self._fill_rect(x, y, w, h, c)
+        else:
+            self._fill_rect(x, y, w, 1, c)
+            self._fill_rect(x, y + h - 1, w, 1, c)
+            self._fill_rect(x, y, 1, h, c)
+            self._fill_rect(x + w - 1, y, 1, h, c)
+
+    def line(self, x1, y1, x2, y2, c):
+        dx = x2 - x1
+        if dx > 0:
+            sx = 1
+        else:
+            dx = -dx
+            sx = -1
+        dy = y2 - y1
+        if dy > 0:
+            sy = 1
+        else:
+            dy = -dy
+            sy = -1
+        steep = False
+        if dy > dx:
+            x1, y1 = y1, x1
+            dx, dy = dy, dx
+            sx, sy = sy, sx
+            steep = True
+        e = 2 * dy - dx
+        for _ in range(dx):
+            if steep:
+                self._set_checked(y1, x1, c)
+            else:
+                self._set_checked(x1, y1, c)
+            while e >= 0:
+                y1 += sy
+                e -= 2 * dx
+            x1 += sx
+            e += 2 * dy
+        self._set_checked(x2, y2, c)
+
+    def _ellipse_points(self, cx, cy, x, y, c, mask):
+        if mask & _FILL:
+            if mask & _Q1:
+                self._fill_rect(cx, cy - y, x + 1, 1, c)
+            if mask & _Q2:
+                self._fill_rect(cx - x, cy - y, x + 1, 1, c)
+            if mask & _Q3:
+                self._fill_rect(cx - x, cy + y, x + 1, 1, c)
+            if mask & _Q4:
+                self._fill_rect(cx, cy + y, x + 1, 1, c)
+        else:
+            self._set_checked(cx + x, cy - y, c, mask & _Q1)
+            self._set_checked(cx - x, cy - y, c, mask & _Q2)
+            self._set_checked(cx - x, cy + y, c, mask & _Q3)
+            self._set_checked(cx + x, cy + y, c, mask & _Q4)
+
+    def ellipse(self, cx, cy, xr, yr, c, f=False, m=0x0F):
+        mask = (_FILL if f else 0) | (m & 0x0F)
+        two_asquare = 2 * xr * xr
+        two_bsquare = 2 * yr * yr
+        x = xr
+        y = 0
+        xchange = yr * yr * (1 - 2 * xr)
+        ychange = xr * xr
+        error = 0
+        stoppingx = two_bsquare * xr
+        stoppingy = 0
+        while stoppingx >= stoppingy:
+            self._ellipse_points(cx, cy, x, y, c, mask)
+            y += 1
+            stoppingy += two_asquare
+            error += ychange
+            ychange += two_asquare
+            if 2 * error + xchange > 0:
+                x -= 1
+                stoppingx -= two_bsquare
+                error += xchange
+                xchange += two_bsquare
+        x = 0
+        y = yr
+        xchange = yr * yr
+        ychange = xr * xr * (1 - 2 * yr)
+        error = 0
+        stoppingx = 0
+        stoppingy = two_asquare * yr
+        while stoppingx <= stoppingy:
+            self._ellipse_points(cx, cy, x, y, c, mask)
+            x += 1
+            stoppingx += two_bsquare
+            error += xchange
+            xchange += two_bsquare
+            if 2 * error + ychange > 0:
+                y -= 1
+                stoppingy -= two_asquare
+                error += ychange
+                ychange += two_asquare
+
+    def poly(self, x, y, coords, c, f=False):
+        n = len(coords) // 2
+        if n == 0:
+            return
+        if not f:
+            px1 = coords[0]
+            py1 = coords[1]
+            i = n * 2 - 1
+            while i >= 0:
+                py2 = coords[i]
+                px2 = coords[i - 1]
+                i -= 2
+                self.line(x + px1, y + py1, x + px2, y + py2, c)
+                px1 = px2
+                py1 = py2
+            return
+        y_min = y_max = coords[1]
+        for i in range(1, n):
+            py = coords[i * 2 + 1]
+            y_min = min(y_min, py)
+            y_max = max(y_max, py)
+        for row in range(y_min, y_max + 1):
+            nodes = []
+            px1 = coords[0]
+            py1 = coords[1]
+            i = n * 2 - 1
+            while i >= 0:
+                py2 = coords[i]
+                px2 = coords[i - 1]
+                i -= 2
+                # the bottom pixel of an edge is left out so it isn't counted
+                # again as the start of the next edge
+                if py1 != py2 and (py1 > row or py2 > row) and (py1 <= row or py2 <= row):
+                    nodes.append(_cdiv(32 * px1 + _cdiv(32 * (px2 - px1) * (row - py1), py2 - py1) + 16, 32))
+                elif row == max(py1, py2):
+                    # local minimum or horizontal edge
+                    if py1 < py2:
+                        self._set_checked(x + px2, y + py2, c)
+                    elif py2 < py1:
+                        self._set_checked(x + px1, y + py1, c)
+                    else:
+                        self.line(x + px1, y + py1, x + px2, y + py2, c)
+                px1 = px2
+                py1 = py2
+            nodes.sort()
+            for i in range(0, len(nodes) - 1, 2):
+                self._fill_rect(x + nodes[i], y + row, nodes[i + 1] - nodes[i] + 1, 1, c)
+
+    def rect_round(self, x, y, w, h, r, c, f=False):
+        # SQUiXL firmware extension: rectangle with radius r corners
+        r = max(0, min(r, w // 2, h // 2))
+        if r == 0:
+            self.rect(x, y, w, h, c, f)
+            return
+        left = x + r
+        right = x + w - r - 1
+        top = y + r
+        bottom = y + h - r - 1
+        if f:
+            self._fill_rect(left, y, right - left + 1, h, c)
+            self._fill_rect(x, top, r, bottom - top + 1, c)
+            self._fill_rect(right + 1, top, r, bottom - top + 1, c)
+        else:
+            self._fill_rect(left, y, right - left + 1, 1, c)
+            self._fill_rect(left, y + h - 1, right - left + 1, 1, c)
+            self._fill_rect(x, top, 1, bottom - top + 1, c)
+            self._fill_rect(x + w - 1, top, 1, bottom - top + 1, c)
+        self.ellipse(right, top, r, r, c, f, _Q1)
+        self.ellipse(left, top, r, r, c, f, _Q2)
+        self.ellipse(left, bottom, r, r, c, f, _Q3)
+        self.ellipse(right, bottom, r, r, c, f, _Q4)
+
+    def blit(self, fbuf, x, y, key=-1, palette=None):
+        if isinstance(fbuf, tuple):
+            fbuf = FrameBuffer(*fbuf)
+        if x >= self.width or y >= self.height or -x >= fbuf.width or -y >= fbuf.height:
+            return
+        x0 = max(0, x)
+        y0 = max(0, y)
+        x1 = max(0, -x)
+        y1 = max(0, -y)
+        x0end = min(self.width, x + fbuf.width)
+        y0end = min(self.height, y + fbuf.height)
+        if (fbuf.format == RGB565 and self.format == RGB565 and key == -1
+                and palette is None):
+            # straight copy, row by row
+            n = (x0end - x0) * 2
+            dst = self._mv
+            src = fbuf._mv
+            for row in range(y0end - y0):
+                d = (x0 + (y0 + row) * self.stride) * 2
+                s = (x1 + (y1 + row) * fbuf.stride) * 2
+                dst[d:d + n] = src[s:s + n]
+            _count((x0end - x0) * (y0end - y0))
+            return
+        if palette is not None:
+            lut = [palette._get(i, 0) for i in range(palette.width)]
+        while y0 < y0end:
+            cx1 = x1
+            for cx0 in range(x0, x0end):
+                col = fbuf._get(cx1, y1)
+                if palette is not None:
+                    col = lut[col] if col < len(lut) else palette._get(col, 0)
+                if col != key:
+                    self._set(cx0, y0, col)
+                cx1 += 1
+            y1 += 1
+            y0 += 1
+
+    def scroll(self, xstep, ystep):
+        if xstep < 0:
+            sx, xend, dx = 0, self.width + xstep, 1
+        else:
+            sx, xend, dx = self.width - 1, xstep - 1, -1
+        if ystep < 0:
+            y, yend, dy = 0, self.height + ystep, 1
+        else:
+            y, yend, dy = self.height - 1, ystep - 1, -1
+        while y != yend:
+            x = sx
+            while x != xend:
+                self._set(x, y, self._get(x - xstep, y - ystep))
+                x += dx
+            y += dy
+
+    def text(self, s, x, y, c=1):
+        # the built in 8x8 font is not reproduced: draw a box per character
+        for i in range(len(s)):
+            self.rect(x + i * 8 + 1, y + 1, 6, 6, c)
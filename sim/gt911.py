@@ -0,0 +1,87 @@
+# gt911.py Host side stand-in for the GT911 touch controller driver.
+# Touches come from the module level panel, which scripts drive directly
+# (press/move/release) or with a timeline of frames. Like the real part the
+# INT pin pulses once per report while a finger is down.
+
+# Released under the MIT License (MIT).
+
+from machine import Pin
+from time import ticks_ms, ticks_diff
+
+REPORT_MS = 10  # GT911 report period
+
+
+class TouchPanel:
+    def __init__(self):
+        self.points = []  # [(x, y, size)], in finger order
+        self.timeline = []  # [(t_ms, points)] still to be applied
+        self.start = 0
+        self.irq_pin = None
+        self.reads = 0
+        self.last_report = 0
+
+    def press(self, x, y, size=30, finger=0):
+        pts = self.points
+        if finger < len(pts):
+            pts[finger] = (x, y, size)
+        else:
+            pts.append((x, y, size))
+        self._report()
+
+    move = press
+
+    def release(self, finger=None):
+        if finger is None:
+            self.points = []
+        elif finger < len(self.points):
+            del self.points[finger]
+        self._report()
+
+    def play(self, frames):
+        """Queue [(t_ms, [(x, y, size), ...]), ...], times relative to now."""
+        self.start = ticks_ms()
+        self.timeline = sorted(frames, key=lambda f: f[0])
+
+    def advance(self):
+        """Apply timeline frames that are due and pulse INT for a report."""
+        now = ticks_diff(ticks_ms(), self.start)
+        changed = False
+        while self.timeline and self.timeline[0][0] <= now:
+            self.points = list(self.timeline.pop(0)[1])
+            changed = True
+        if changed:
+            self._report()
+        elif self.points and ticks_diff(ticks_ms(), self.last_report) >= REPORT_MS:
+            self._report()
+        return bool(self.timeline)
+
+    async def run(self):
+        """Play the timeline in real time, pulsing INT as the GT911 would."""
+        import asyncio
+        while self.advance() or self.points:
+            await asyncio.sleep_ms(REPORT_MS)
+
+    def _report(self):
+        self.last_report = ticks_ms()
+        if self.irq_pin is not None:
+            self.irq_pin.pulse()
+
+
+panel = TouchPanel()
+
+
+class GT911:
+    def __init__(self, i2c, irq_pin=None, reset_pin=None, ioex=None, address=0x5D):
+        self.i2c = i2c
+        self.address = address
+        if irq_pin is not None:
+            panel.irq_pin = Pin(irq_pin, Pin.IN)
+
+    def read_points(self):
+        panel.advance()
+        panel.reads += 1
+        pts = list(panel.points)
+        return len(pts), pts
+
+    def clear_points(self):
+        pass
@@ -0,0 +1,44 @@
+# lca9555.py Host side stand-in for the LCA9555 16 bit IO expander driver.
+# Talks to the register device the simulator puts on the I2C bus at 0x20, so
+# I2C transaction counts match a real per-pin driver: one write per call.
+
+# Released under the MIT License (MIT).
+
+INPUT = 1
+OUTPUT = 0
+HIGH = 1
+LOW = 0
+
+_INPUT_PORT0 = 0x00
+_OUTPUT_PORT0 = 0x02
+_CONFIG_PORT0 = 0x06
+
+
+class LCA9555:
+    def __init__(self, i2c, address=0x20):
+        self.i2c = i2c
+        self.address = address
+        self._out = bytearray(i2c.readfrom_mem(address, _OUTPUT_PORT0, 2))
+        self._cfg = bytearray(i2c.readfrom_mem(address, _CONFIG_PORT0, 2))
+
+    def pin_mode(self, pin, mode, value=None):
+        port, bit = pin >> 3, 1 << (pin & 7)
+        if mode == INPUT:
+            self._cfg[port] |= bit
+        else:
+            self._cfg[port] &= ~bit
+            if value is not None:
+                self.write(pin, value)
+        self.i2c.writeto_mem(self.address, _CONFIG_PORT0 + port, self._cfg[port:port + 1])
+
+    def write(self, pin, value):
+        port, bit = pin >> 3, 1 << (pin & 7)
+        if value:
+            self._out[port] |= bit
+        else:
+            self._out[port] &= ~bit
+        self.i2c.writeto_mem(self.address, _OUTPUT_PORT0 + port, self._out[port:port + 1])
+
+    def read(self, pin):
+        port = pin >> 3
+        return (self.i2c.readfrom_mem(self.address, _INPUT_PORT0 + port, 1)[0] >> (pin & 7)) & 1
@@ -0,0 +1,375 @@
+# machine.py Host side stand-in for the ESP32-S3 machine module.
+# Only what the SQUiXL libraries use: Pin (with IRQs), I2C with a bus of fake
+# register devices, PWM, the RGB panel driver, I2S and RTC.
+
+# Released under the MIT License (MIT).
+
+import time
+
+# -- Pin ---------------------------------------------------------------------
+
+
+class Pin:
+    IN = 1
+    OUT = 3
+    OPEN_DRAIN = 7
+    PULL_UP = 2
+    PULL_DOWN = 1
+    IRQ_RISING = 1
+    IRQ_FALLING = 2
+
+    class board:
+        TP_SCL = 'TP_SCL'
+        TP_SDA = 'TP_SDA'
+
+    _pins = {}  # id -> Pin, so scripts can drive inputs and fire IRQs
+
+    def __new__(cls, id, *args, **kwargs):
+        pin = cls._pins.get(id)
+        if pin is None:
+            pin = object.__new__(cls)
+            pin.id = id
+            pin._value = 1
+            pin._mode = None
+            pin._handler = None
+            pin._trigger = 0
+            cls._pins[id] = pin
+        return pin
+
+    def __init__(self, id, mode=None, pull=None, value=None):
+        if mode is not None:
+            self._mode = mode
+        if value is not None:
+            self._value = value
+
+    def init(self, mode=None, pull=None, value=None):
+        self.__init__(self.id, mode, pull, value)
+
+    def value(self, v=None):
+        if v is None:
+            return self._value
+        self._value = 1 if v else 0
+
+    def on(self):
+        self._value = 1
+
+    def off(self):
+        self._value = 0
+
+    def irq(self, handler=None, trigger=IRQ_FALLING | IRQ_RISING, hard=False):
+        self._handler = handler
+        self._trigger = trigger
+
+    def drive(self, level):
+        """Simulator: set an input level, firing the IRQ handler on a matching edge."""
+        level = 1 if level else 0
+        old = self._value
+        self._value = level
+        if self._handler is None or old == level:
+            return
+        if (level == 0 and self._trigger & Pin.IRQ_FALLING) or (level == 1 and self._trigger & Pin.IRQ_RISING):
+            self._handler(self)
+
+    def pulse(self):
+        """Simulator: a low going pulse, as the GT911 INT line produces per report."""
+        self.drive(0)
+        self.drive(1)
+
+
+# -- I2C ---------------------------------------------------------------------
+
+
+class RegisterDevice:
+    """A fake I2C device: a bank of 8 bit registers with auto increment."""
+
+    def __init__(self, size=256, init=None):
+        self.regs = bytearray(size)
+        if init:
+            for reg, value in init.items():
+                self.regs[reg] = value
+        self.writes = []  # (reg, bytes) in arrival order
+
+    def read(self, reg, n):
+        return bytes(self.regs[(reg + i) % len(self.regs)] for i in range(n))
+
+    def write(self, reg, data):
+        self.writes.append((reg, bytes(data)))
+        for i, b in enumerate(data):
+            self.regs[(reg + i) % len(self.regs)] = b
+
+
+class PortExpander(RegisterDevice):
+    """LCA9555 registers: the data bytes of one write alternate between the
+    two registers of a port pair. Every output port 0 level lands in port0_log,
+    so SPI bit banged on the expander can be decoded."""
+
+    def __init__(self, init=None):
+        super().__init__(8, init)
+        self.port0_log = []
+
+    def write(self, reg, data):
+        self.writes.append((reg, bytes(data)))
+        for b in data:
+            self.regs[reg & 7] = b
+            if reg & 7 == 2:
+                self.port0_log.append(b)
+            reg ^= 1
+
+
+class HapticDriver(RegisterDevice):
+    """DRV2605 registers: the GO bit clears once the waveform sequence has
+    had time to play, 30 ms per effect plus the pauses."""
+
+    GO = 0x0C
+    EFFECT_MS = 30
+
+    def __init__(self, init=None):
+        super().__init__(0x23, init)
+        self.plays = 0
+        self._until = 0
+
+    def _now(self):
+        return time.perf_counter()
+
+    def read(self, reg, n):
+        if self.regs[self.GO] & 1 and self._now() >= self._until:
+            self.regs[self.GO] &= ~1
+        return super().read(reg, n)
+
+    def write(self, reg, data):
+        super().write(reg, data)
+        if reg <= self.GO < reg + len(data) and self.regs[self.GO] & 1:
+            ms = 0
+            for slot in self.regs[0x04:0x0C]:
+                if not slot:
+                    break
+                ms += (slot & 0x7F) * 10 if slot & 0x80 else self.EFFECT_MS
+            self._until = self._now() + ms / 1000
+            self.plays += 1
+
+
+class I2C:
+    devices = {}  # addr -> device with read(reg, n) / write(reg, data)
+
+    def __init__(self, id=0, scl=None, sda=None, freq=400_000, timeout=50_000):
+        self.id = id
+        self.freq = freq
+        self.transactions = 0
+        self.bytes = 0
+
+    @classmethod
+    def attach(cls, addr, device):
+        """Simulator: put a fake device on the bus."""
+        cls.devices[addr] = device
+        return device
+
+    def _device(self, addr):
+        self.transactions += 1
+        dev = I2C.devices.get(addr)
+        if dev is None:
+            raise OSError(19)  # ENODEV, as the ESP32 port reports a NACK
+        return dev
+
+    def scan(self):
+        return sorted(I2C.devices)
+
+    def readfrom_mem(self, addr, memaddr, nbytes, addrsize=8):
+        data = self._device(addr).read(memaddr, nbytes)
+        self.bytes += nbytes + 1
+        return data
+
+    def readfrom_mem_into(self, addr, memaddr, buf, addrsize=8):
+        buf[:] = self._device(addr).read(memaddr, len(buf))
+        self.bytes += len(buf) + 1
+
+    def writeto_mem(self, addr, memaddr, buf, addrsize=8):
+        self._device(addr).write(memaddr, buf)
+        self.bytes += len(buf) + 1
+
+    def writeto(self, addr, buf, stop=True):
+        # first byte is the register pointer
+        if len(buf):
+            self._device(addr).write(buf[0], buf[1:])
+        else:
+            self._device(addr)
+        self.bytes += len(buf)
+        return 1
+
+    def readfrom(self, addr, nbytes, stop=True):
+        self.bytes += nbytes
+        return self._device(addr).read(0, nbytes)
+
+    def readfrom_into(self, addr, buf, stop=True):
+        buf[:] = self.readfrom(addr, len(buf))
+
+    def writevto(self, addr, vector, stop=True):
+        return self.writeto(addr, b''.join(bytes(v) for v in vector), stop)
+
+
+SoftI2C = I2C
+
+
+# -- PWM ---------------------------------------------------------------------
+
+
+class PWM:
+    def __init__(self, pin, freq=5000, duty_u16=0):
+        self._freq = freq
+        self._duty = duty_u16
+
+    def freq(self, f=None):
+        if f is None:
+            return self._freq
+        self._freq = f
+
+    def duty_u16(self, d=None):
+        if d is None:
+            return self._duty
+        self._duty = d
+
+    def deinit(self):
+        pass
+
+
+# -- RGB panel ---------------------------------------------------------------
+
+
+class RGB:
+    """The SQUiXL RGB565 panel driver. Frame buffers are plain bytearrays."""
+
+    instance = None  # the last panel created, for simulator.save_frame()
+
+    def __init__(self, width, height, data_pins=None, num_fbs=1, bits_per_pixel=16, **kwargs):
+        self.width = width
+        self.height = height
+        self.buffers = [bytearray(width * height * bits_per_pixel // 8) for _ in range(num_fbs)]
+        self.shown = 0
+        self.flips = 0
+        RGB.instance = self
+
+    def get_buffer(self, index=0):
+        return self.buffers[index]
+
+    def show(self, index=0):
+        self.shown = index
+        self.flips += 1
+
+    def frame(self):
+        """Simulator: the buffer currently being scanned out."""
+        return self.buffers[self.shown]
+
+    def deinit(self):
+        if RGB.instance is self:
+            RGB.instance = None
+
+
+# -- I2S ---------------------------------------------------------------------
+
+
+class I2S:
+    RX = 0
+    TX = 1
+    MONO = 0
+    STEREO = 1
+
+    def __init__(self, id, sck=None, ws=None, sd=None, mode=TX, bits=16, format=MONO, rate=22050, ibuf=2000):
+        self.id = id
+        self.bits = bits
+        self.format = format
+        self.rate = rate
+        self.ibuf = ibuf
+        self.written = 0  # bytes accepted so far
+        self.captured = bytearray() if I2S.capture else None
+        self._irq = None
+        self._free_at = 0
+
+    capture = False  # keep every byte written, in captured
+
+    def write(self, buf):
+        self.written += len(buf)
+        if self.captured is not None:
+            self.captured += buf
+        if self._irq is not None:
+            # non-blocking mode: the irq fires once the buffer has gone out
+            # at the sample rate, after whatever is queued ahead of it
+            import asyncio
+            frame = self.bits // 8 * (2 if self.format == I2S.STEREO else 1)
+            now = time.perf_counter()
+            self._free_at = max(now, self._free_at) + len(buf) / frame / self.rate
+            try:
+                asyncio.get_running_loop().call_later(self._free_at - now, self._irq, self)
+            except RuntimeError:
+                self._irq(self)
+        return len(buf)
+
+    def readinto(self, buf):
+        for i in range(len(buf)):
+            buf[i] = 0
+        return len(buf)
+
+    def irq(self, handler):
+        self._irq = handler
+
+    def deinit(self):
+        pass
+
+    @staticmethod
+    def shift(buf=None, bits=16, shift=0):
+        # arithmetic shift of each sample in place, as the firmware does
+        if bits == 16:
+            mv = memoryview(buf).cast('h')
+            for i in range(len(mv)):
+                v = mv[i] << shift if shift > 0 else mv[i] >> -shift
+                mv[i] = max(-32768, min(32767, v))
+        else:
+            mv = memoryview(buf).cast('i')
+            for i in range(len(mv)):
+                v = mv[i] << shift if shift > 0 else mv[i] >> -shift
+                mv[i] = max(-2147483648, min(2147483647, v))
+
+
+# -- RTC and misc ------------------------------------------------------------
+
+
+class RTC:
+    _memory = b''  # survives a soft reset of the simulated board
+
+    def memory(self, data=None):
+        if data is None:
+            return RTC._memory
+        RTC._memory = bytes(data)
+
+    def datetime(self, dt=None):
+        if dt is None:
+            t = time.localtime()
+            return (t[0], t[1], t[2], t[6], t[3], t[4], t[5], 0)
+
+
+PWRON_RESET = 1
+HARD_RESET = 2
+WDT_RESET = 3
+DEEPSLEEP_RESET = 4
+SOFT_RESET = 5
+
+_reset_cause = PWRON_RESET
+
+
+def reset_cause():
+    return _reset_cause
+
+
+def freq(f=None):
+    if f is None:
+        return 240_000_000
+
+
+def unique_id():
+    return b'\x53\x51\x55\x49\x58\x4c'
+
+
+def disable_irq():
+    return 0
+
+
+def enable_irq(state=0):
+    pass
@@ -0,0 +1,24 @@
+# max17048.py Host side stand-in for the MAX17048 fuel gauge driver.
+
+# Released under the MIT License (MIT).
+
+_REG_VCELL = 0x02
+_REG_SOC = 0x04
+
+
+class MAX17048:
+    def __init__(self, i2c, address=0x36):
+        self.i2c = i2c
+        self.address = address
+
+    def _read_u16(self, reg):
+        b = self.i2c.readfrom_mem(self.address, reg, 2)
+        return (b[0] << 8) | b[1]
+
+    @property
+    def cell_voltage(self):
+        return self._read_u16(_REG_VCELL) * 78.125 / 1_000_000
+
+    @property
+    def state_of_charge(self):
+        return self._read_u16(_REG_SOC) / 256
@@ -0,0 +1,30 @@
+# micropython.py Host side stand-in for the micropython module.
+
+# Released under the MIT License (MIT).
+
+
+def const(x):
+    return x
+
+
+def native(f):
+    return f
+
+
+viper = native
+
+
+def schedule(func, arg):
+    func(arg)
+
+
+def alloc_emergency_exception_buf(size):
+    pass
+
+
+def mem_info(verbose=False):
+    print('mem_info: not available in the simulator')
+
+
+def opt_level(level=None):
+    return 0
@@ -0,0 +1,69 @@
+# sim_demo.py Render a small SQUiXL UI on the host and dump it to PNG.
+#   python3 sim/sim_demo.py [out_dir]
+
+import sys
+import simulator
+simulator.install()
+
+import asyncio
+import framebuf
+import squixl
+from writer import CWriter
+from colors import *
+from simfont import make_font
+from squixl_ui_EX import (UIManager, UILabel, UITextBox, UIButton, UISlider,
+    UICheckBox, UIProgressBar, UIDial, TouchEvent, TOUCH_TAP, WriterDevice,
+    ALIGNMENT_CENTER)
+
+out = sys.argv[1] if len(sys.argv) > 1 else '.'
+
+buf = squixl.create_display()
+squixl.init()
+wbuf = WriterDevice(framebuf.FrameBuffer(buf, 480, 480, framebuf.RGB565))
+font = CWriter(wbuf, make_font(16, 9, True), fgcolor=WHITE, verbose=False)
+big = CWriter(wbuf, make_font(24, 13, True), fgcolor=WHITE, verbose=False)
+
+mgr = UIManager(wbuf, font)
+mgr.add_screen('home', GREY)
+mgr.add_screen('dials', LIGHTGREY)
+
+title = UILabel(20, 10, 440, 0, 'Simulator', text_color=PINK)
+title.set_font(big)
+title.align = ALIGNMENT_CENTER
+mgr.add_control('home', title)
+mgr.add_control('home', UICheckBox(x=20, y=60, text='WiFi', size=35, checked=True))
+level = UILabel(20, 120, 0, 0, 'Level: 50')
+mgr.add_control('home', level)
+mgr.add_control('home', UISlider(x=20, y=140, w=440, h=30, min_val=0, max_val=100, value=50,
+    callback=lambda v: level.set_text(f'Level: {int(v)}')))
+mgr.add_control('home', UIProgressBar(x=20, y=200, w=440, h=25, value=30))
+tb = UITextBox(280, 250, 175, 30, text='Press', fg_color=GREEN, bg_color=SQBLUE, text_color=PINK)
+mgr.add_control('home', tb)
+mgr.add_control('home', UIButton(40, 400, 120, 40, 'Dials',
+    callback=lambda: (mgr.set_screen('dials'), mgr.draw_all())))
+dial = UIDial(240, 220, 100, smallticks=16, bigticks=4,
+    chr_list=('N', 'NE', 'E', 'SE', 'S', 'SW', 'W', 'NW'))
+mgr.add_control('dials', dial)
+mgr.set_screen('home')
+mgr.draw_all()
+simulator.save_frame(out + '/home.png')
+
+
+async def main():
+    renderer = asyncio.create_task(mgr.render(fps=50))
+    # scripted touch: tap the slider at 80 %, then the Dials button
+    simulator.panel.press(20 + 440 * 8 // 10, 155)
+    n, pts = squixl.touch.read_points()
+    mgr.process_touch(TouchEvent(TOUCH_TAP, pts[0][0], pts[0][1]))
+    simulator.panel.release()
+    await asyncio.sleep_ms(60)
+    simulator.save_frame(out + '/home_slider.png')
+    mgr.process_touch(TouchEvent(TOUCH_TAP, 100, 420))
+    await asyncio.sleep_ms(60)
+    dial.set_value(135)
+    await asyncio.sleep_ms(60)
+    simulator.save_frame(out + '/dials.png')
+    renderer.cancel()
+
+asyncio.run(main())
+print('frames written to', out)
@@ -0,0 +1,75 @@
+# simfont.py Stand-in fonts with the font_to_py module interface.
+# The font modules of a real build are not in the repo, so the simulator
+# makes horizontally mapped fonts of any size: each glyph is a box with the
+# character code drawn as bits inside it, proportional widths if asked for.
+
+# Released under the MIT License (MIT).
+
+
+class SimFont:
+    def __init__(self, height=16, width=8, proportional=False):
+        self._height = height
+        self._width = width
+        self._proportional = proportional
+        self._glyphs = {}
+
+    def height(self):
+        return self._height
+
+    def max_width(self):
+        return self._width
+
+    def baseline(self):
+        return self._height - self._height // 5
+
+    def hmap(self):
+        return True
+
+    def reverse(self):
+        return False
+
+    def monospaced(self):
+        return not self._proportional
+
+    def min_ch(self):
+        return 32
+
+    def max_ch(self):
+        return 126
+
+    def _glyph_width(self, code):
+        if not self._proportional:
+            return self._width
+        return max(2, self._width - (code * 7) % (self._width // 2 + 1))
+
+    def get_ch(self, ch):
+        code = ord(ch)
+        if code < 32 or code > 126:
+            code = 63  # '?', the default character
+        g = self._glyphs.get(code)
+        if g is None:
+            w = self._glyph_width(code)
+            h = self._height
+            bpr = (w + 7) // 8
+            buf = bytearray(bpr * h)
+
+            def setp(x, y):
+                buf[y * bpr + (x >> 3)] |= 0x80 >> (x & 7)
+
+            if code != 32:
+                for x in range(1, w - 1):
+                    setp(x, 1)
+                    setp(x, h - 2)
+                for y in range(1, h - 1):
+                    setp(1, y)
+                    setp(w - 2, y)
+                for bit in range(7):
+                    if code >> bit & 1 and 3 + bit < h - 2 and w > 4:
+                        setp(w // 2, 3 + bit)
+            g = (memoryview(buf), h, w)
+            self._glyphs[code] = g
+        return g
+
+
+def make_font(height=16, width=8, proportional=False):
+    return SimFont(height, width, proportional)
@@ -0,0 +1,179 @@
+# simulator.py Run the SQUiXL MicroPython stack on a host.
+# Puts the stand-in modules in this directory ahead of lib/ on sys.path,
+# fills in the MicroPython extensions to time, asyncio and gc that CPython
+# lacks, and populates the fake I2C bus with the devices on a SQUiXL board.
+#
+# Usage:
+#   python3 sim/simulator.py ui_example_asyncT.py   run a script on the host
+#
+#   import simulator; simulator.install()           from a benchmark or test
+#   import squixl_ui_EX ...
+#   simulator.panel.press(100, 200)                 scripted touches
+#   simulator.save_frame('frame.png')               what the panel shows
+
+# Released under the MIT License (MIT).
+
+import os
+import sys
+
+SIM_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(SIM_DIR)
+LIB_DIR = os.path.join(ROOT, 'lib')
+
+# Fake I2C device addresses, as populated on a SQUiXL
+LCA9555_ADDR = 0x20
+MAX17048_ADDR = 0x36
+GT911_ADDR = 0x5D
+DRV2605_ADDR = 0x5A
+
+_installed = False
+panel = None  # gt911.panel once installed
+
+
+def _patch_time():
+    import time
+    if hasattr(time, 'ticks_ms'):
+        return  # MicroPython unix port
+    t0 = time.perf_counter_ns()
+
+    def ticks_us():
+        return ((time.perf_counter_ns() - t0) // 1000) & 0x3FFFFFFF
+
+    def ticks_ms():
+        return ((time.perf_counter_ns() - t0) // 1_000_000) & 0x3FFFFFFF
+
+    def ticks_diff(a, b):
+        return ((a - b + 0x20000000) & 0x3FFFFFFF) - 0x20000000
+
+    def ticks_add(a, b):
+        return (a + b) & 0x3FFFFFFF
+
+    time.ticks_us = ticks_us
+    time.ticks_ms = ticks_ms
+    time.ticks_cpu = ticks_us
+    time.ticks_diff = ticks_diff
+    time.ticks_add = ticks_add
+    time.sleep_ms = lambda ms: time.sleep(ms / 1000)
+    time.sleep_us = lambda us: time.sleep(us / 1_000_000)
+
+
+def _patch_asyncio():
+    import asyncio
+    if hasattr(asyncio, 'ThreadSafeFlag'):
+        return
+
+    class ThreadSafeFlag:
+        def __init__(self):
+            self._event = asyncio.Event()
+
+        def set(self):
+            self._event.set()
+
+        def clear(self):
+            self._event.clear()
+
+        async def wait(self):
+            await self._event.wait()
+            self._event.clear()
+
+    asyncio.ThreadSafeFlag = ThreadSafeFlag
+    asyncio.sleep_ms = lambda ms: asyncio.sleep(ms / 1000)
+    asyncio.wait_for_ms = lambda aw, ms: asyncio.wait_for(aw, ms / 1000)
+
+
+def _patch_gc():
+    import gc
+    if hasattr(gc, 'mem_free'):
+        return
+    import tracemalloc
+    heap = 8 * 1024 * 1024  # PSRAM heap of a SQUiXL
+
+    def mem_alloc():
+        return tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+
+    gc.mem_alloc = mem_alloc
+    gc.mem_free = lambda: max(0, heap - mem_alloc())
+
+
+def _populate_bus():
+    from machine import I2C, RegisterDevice, PortExpander, HapticDriver
+    # LCA9555: outputs high and all pins inputs at power on, VBUS present
+    I2C.attach(LCA9555_ADDR, PortExpander({0: 0x00, 1: 0x08, 2: 0xFF, 3: 0xFF, 6: 0xFF, 7: 0xFF}))
+    # MAX17048: 3.9 V, 80 %
+    vcell = int(3.9 / 78.125e-6)
+    I2C.attach(MAX17048_ADDR, RegisterDevice(256, {2: vcell >> 8, 3: vcell & 0xFF, 4: 80, 5: 0}))
+    I2C.attach(GT911_ADDR, RegisterDevice(256))
+    # DRV2605: device id 7 in the status register
+    I2C.attach(DRV2605_ADDR, HapticDriver({0: 7 << 5}))
+
+
+def install():
+    """Make the stand-in modules and lib/ importable and patch the runtime."""
+    global _installed, panel
+    if _installed:
+        return
+    for path in (ROOT, LIB_DIR, SIM_DIR):
+        if path in sys.path:
+            sys.path.remove(path)
+        sys.path.insert(0, path)
+    _patch_time()
+    _patch_asyncio()
+    _patch_gc()
+    _populate_bus()
+    import gt911
+    panel = gt911.panel
+    _installed = True
+
+
+def frame():
+    """The frame buffer the fake panel is scanning out."""
+    from machine import RGB
+    return RGB.instance.frame() if RGB.instance else None
+
+
+def save_png(path, buf, width=480, height=480):
+    """Write an RGB565 buffer to a PNG file."""
+    import struct
+    import zlib
+    mv = memoryview(buf)
+    raw = bytearray()
+    for y in range(height):
+        raw.append(0)  # filter: none
+        row = mv[y * width * 2:(y + 1) * width * 2]
+        for i in range(0, width * 2, 2):
+            c = row[i] | (row[i + 1] << 8)
+            r = (c >> 11) & 0x1F
+            g = (c >> 5) & 0x3F
+            b = c & 0x1F
+            raw += bytes(((r << 3) | (r >> 2), (g << 2) | (g >> 4), (b << 3) | (b >> 2)))
+
+    def chunk(tag, data):
+        return (struct.pack('>I', len(data)) + tag + data
+                + struct.pack('>I', zlib.crc32(tag + data) & 0xFFFFFFFF))
+
+    with open(path, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)))
+        f.write(chunk(b'IDAT', zlib.compress(bytes(raw), 6)))
+        f.write(chunk(b'IEND', b''))
+
+
+def save_frame(path):
+    """Write what the fake panel is showing to a PNG file."""
+    from machine import RGB
+    lcd = RGB.instance
+    save_png(path, lcd.frame(), lcd.width, lcd.height)
+
+
+def run(script):
+    import runpy
+    install()
+    sys.argv = [script] + sys.argv[2:]
+    runpy.run_path(script, run_name='__main__')
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print('usage: simulator.py script.py [args]')
+        sys.exit(1)
+    run(sys.argv[1])
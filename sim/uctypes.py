@@ -0,0 +1,13 @@
+# uctypes.py Host side stand-in for the two uctypes calls writer.py makes.
+# There are no raw addresses on the host: addressof() hands back the object
+# itself and bytearray_at() views it again.
+
+# Released under the MIT License (MIT).
+
+
+def addressof(obj):
+    return obj
+
+
+def bytearray_at(addr, size):
+    return memoryview(addr)[:size]
@@ -1,10 +1,13 @@
 # Section 1 - imports *******************************
+# imported first: boot phases are timed from here
+import squixl_profile as profile
 import framebuf, gc
 import squixl
 import time
 from time import ticks_ms, ticks_diff
 from time import sleep_ms
 import math
+import json
 from writer import CWriter
 
 from colors import *
@@ -26,17 +29,30 @@ from squixl_ui_EX import ( UIManager, UILabel, UITextBox, UITextOnly, UIButton,
     UISlider, UICheckBox, UIProgressBar,UIDial, TouchEvent, TOUCH_TAP, TOUCH_DRAG,
     TOUCH_DRAG_END, rgb_to_565, WriterDevice,
     ALIGNMENT_LEFT, ALIGNMENT_CENTER, ALIGNMENT_RIGHT )
+from squixl_ui_EX import ( TOUCH_DOUBLE, TOUCH_LONG, TOUCH_SWIPE_UP, TOUCH_SWIPE_DOWN,
+    TOUCH_SWIPE_LEFT, TOUCH_SWIPE_RIGHT, TOUCH_PINCH, TOUCH_TWO_DRAG, TOUCH_TWO_END,
+    TOUCH_TWO_TAP )
+from squixl_touch import TouchReader, GestureRecognizer
 
 gc.collect()
+profile.mark('imports')
 
 
 # Section 2 - set up squixl and fonts ***************************
 
+# Set True to draw into a second frame buffer and flip (needs RGB firmware
+# with double buffer support, otherwise back_buf is None and nothing changes)
+DOUBLE_BUFFER = False
+
 # Create the display and get the screen buffer
-buf = squixl.create_display()
+if DOUBLE_BUFFER:
+    buf, back_buf = squixl.create_display(double_buffer=True)
+else:
+    buf, back_buf = squixl.create_display(), None
 
-# Bit bang the screen initialisation
-squixl.screen_init_spi_bitbanged()
+# Bring up the panel (skipped after a soft reset) and touch. Haptics and the
+# fuel gauge are not used here, so they are left until first use
+squixl.init(display=True, touch=True)
 
 # Create a framebuf from the screen buffer
 fb = framebuf.FrameBuffer(buf, 480, 480, framebuf.RGB565)
@@ -50,10 +66,14 @@ font_bold_18 = CWriter(wbuf, robotomono_bold_18, fgcolor=WHITE, verbose=False)
 font_bold_22 = CWriter(wbuf, robotomono_bold_22, fgcolor=WHITE, verbose=False)
 font_bold_24 = CWriter(wbuf, robotomono_bold_24, fgcolor=WHITE, verbose=False)
 font_courier20 = CWriter(wbuf, courier20, fgcolor=WHITE, verbose=False)
+profile.mark('display+fonts')
 
 # Create the UI manager and pass it the CWrite buffer to enable custom fonts
 # set Robotomono_Light_16 font as a default font.
 mgr = UIManager(wbuf, font_light_16)
+if back_buf is not None:
+    back_fb = framebuf.FrameBuffer(back_buf, 480, 480, framebuf.RGB565)
+    mgr.enable_page_flip(WriterDevice(back_fb), squixl.show_buffer)
 
 # Section 3 - create the logical screens *****************************
 # create a screen called 'startup' used to show status
@@ -121,7 +141,7 @@ bright_lbl.font =font_bold_22
 mgr.add_control('home',bright_lbl)
 #  - a slider
 bright_sld = UISlider( x=20, y=220, w=440, h=30, min_val=0, max_val=100, value=50,
-    callback=lambda v: bright_lbl.set_text(f"Brightness: {int(v)}"),
+    callback=lambda v: bright_lbl.set_text(f"Brightness: {int(v)}"), callback_ms=100,
     track_color=rgb_to_565(180, 180, 180),
     knob_color=rgb_to_565(0, 120, 255),
     bg_color=rgb_to_565(60, 60, 60) )
@@ -134,7 +154,7 @@ vol_lbl.set_alignment(ALIGNMENT_RIGHT)
 mgr.add_control('home', vol_lbl)
 #  - a slider
 vol_sld = UISlider(x=20, y=280, w=440, h=30, min_val=0, max_val=100, value=50,
-    callback=lambda v: vol_lbl.set_text(f"Volume: {int(v)}"),
+    callback=lambda v: vol_lbl.set_text(f"Volume: {int(v)}"), callback_on_release=True,
     track_color=rgb_to_565(180, 180, 180),
     knob_color=rgb_to_565(255, 100, 100),
     bg_color=rgb_to_565(60, 60, 60) )
@@ -244,6 +264,8 @@ go_home.callback=screen_home
 mgr.add_control('w_data', go_home)
 
 
+profile.mark('screens')
+
 # Section 5  Touch events *******************************************
 def screen_swipe(direction):
     if direction == 'D':
@@ -263,53 +285,52 @@ def screen_swipe(direction):
 def screen_tap(x,y):
     tb_1.set_text(str(x)+':'+str(y))
     evt = TouchEvent(TOUCH_TAP, x, y)
+    mgr.flush_touches()
     mgr.process_touch(evt)
 
 
-async def touch_check():
-    tap_move = 20 # threshold for tap finger movement. >20 means a deliberate drag.
-    while True:
-        n, points = squixl.touch.read_points()
-        while n > 0:
-            ts = ticks_ms()
-            xStart = points[0][0]
-            yStart = points[0][1]
-            size = points[0][2]
-            await asyncio.sleep_ms(100)
-            n, points = squixl.touch.read_points()
-            while n > 0:
-                xEnd = points[0][0]
-                yEnd = points[0][1]
-                await asyncio.sleep_ms(100)
-                n, points = squixl.touch.read_points()
-            te = ticks_ms()
-            tap_time = ticks_diff(te,ts)              
-            yMove = yEnd - yStart
-            xMove = xEnd - xStart      
-            if yMove or xMove > tap_move:
-                if abs(yMove) > abs(xMove):
-                    if yMove > 0:
-                        screen_swipe('D')
-                    else:
-                        screen_swipe('U')
-                else:
-                    if xMove > 0:
-                        screen_swipe('R')
-                    else:
-                        screen_swipe('L')
-            # So not a swipe - must be a press     
-            else:
-                if tap_time < 400:
-                    #Short tap
-                    screen_tap(xStart,yStart)
-                elif tap_time < 700:
-                    #Medium tap
-                    screen_tap(xEnd,yEnd)
-                else:
-                    #Long tap
-                    screen_tap(xEnd,yEnd)
-        squixl.touch.clear_points()        
-        await asyncio.sleep_ms(100)
+# The touch reader sleeps until the GT911 interrupts, then samples at the
+# controller's report rate until the finger lifts
+touch_reader = TouchReader(squixl.touch, bus=squixl.bus)
+
+# Swipe gestures to screen_swipe() directions
+SWIPE_DIRECTIONS = {TOUCH_SWIPE_UP: 'U', TOUCH_SWIPE_DOWN: 'D',
+                    TOUCH_SWIPE_LEFT: 'L', TOUCH_SWIPE_RIGHT: 'R'}
+
+# None until the first TOUCH_DRAG of a drag, then whether a control took it
+drag_owned = None
+
+def on_gesture(evt):
+    global drag_owned
+    if evt.type in (TOUCH_TAP, TOUCH_DOUBLE, TOUCH_LONG):
+        screen_tap(evt.x, evt.y)
+    elif evt.type == TOUCH_DRAG:
+        # a drag that starts on a control (e.g. a slider) stays with it,
+        # one that starts on the background can only swipe
+        if drag_owned is None:
+            mgr.flush_touches()
+            # hit-test where the finger went down: by the first drag it has
+            # moved TAP_MOVE, further than the controls' touch padding
+            start = TouchEvent(TOUCH_DRAG, evt.x - evt.dx, evt.y - evt.dy,
+                               0, 0, evt.vx, evt.vy, evt.t)
+            drag_owned = mgr.process_touch(start)
+            if drag_owned:
+                mgr.process_touch(evt)
+        elif drag_owned:
+            # the rest of the drag is coalesced to one position per frame
+            mgr.post_touch(evt)
+    elif evt.type in SWIPE_DIRECTIONS:
+        if not drag_owned:
+            screen_swipe(SWIPE_DIRECTIONS[evt.type])
+    elif evt.type == TOUCH_DRAG_END:
+        if drag_owned:
+            mgr.post_touch(evt)
+        drag_owned = None
+    elif evt.type in (TOUCH_PINCH, TOUCH_TWO_DRAG, TOUCH_TWO_END, TOUCH_TWO_TAP):
+        # two finger gestures go to the control under the fingers' centre
+        mgr.post_touch(evt)
+
+gestures = GestureRecognizer(on_gesture)
 
 
 # *****************************************************
@@ -396,27 +417,36 @@ def wifi():
     wlan.active(True)
     if not wlan.isconnected():
         sprint.set_text('connecting to network...', font_bold_22, GREEN)
+        mgr.redraw()
         wlan.connect(SSID, PW)
         while not wlan.isconnected():
             pass
     sprint.set_text('network connected:', font_bold_22, GREEN)
+    mgr.redraw()
     #sprint.set_text(str( wlan.ifconfig()),font_bold_22, GREEN)
 
 
 async def main(client):
     wifi()
+    profile.mark('wifi')
     sprint.set_text('connecting to mqtt',font_bold_22, GREEN)
+    mgr.redraw()
     await client.connect()
+    profile.mark('mqtt')
     sprint.set_text('subscribing topics to mqtt',font_bold_22, GREEN)
+    mgr.redraw()
     asyncio.create_task(mqtt.up(client))
     asyncio.create_task(mqtt.down(client))
    
     sprint.set_text('creating tasks',font_bold_22, GREEN)
+    mgr.redraw()
     asyncio.create_task(messages(client))
-    asyncio.create_task(touch_check())
+    asyncio.create_task(touch_reader.run())
+    asyncio.create_task(gestures.run(touch_reader.queue))
     
     # create demo async tasks
     sprint.set_text('creating test tasks',font_bold_22, GREEN)
+    mgr.redraw()
     topic = 'SQUiXL/Test/Test1'
     wait_time = 1
     asyncio.create_task(test_publish(client, topic, wait_time))
@@ -426,10 +456,18 @@ async def main(client):
     # move from setup to home screen              
     mgr.set_screen('home')
     mgr.draw_all()
+    profile.mark('home screen')
+
+    # boot profile to the console and the broker, to compare firmware releases
+    profile.report()
+    await client.publish(BOOT_TOPIC, json.dumps(profile.summary()))
+
+    # keep the home and w_data screens rendered off screen so swiping
+    # between them is a single copy
+    mgr.enable_screen_cache(2)
     
-    
-    while True:
-        await asyncio.sleep(0)
+    # from here on widget updates are coalesced and painted once per frame
+    await mgr.render(fps=20)
     
 # -------------------------------------
 
@@ -438,6 +476,8 @@ async def main(client):
 
 # for  mqtt last will and testomy registration with broker
 LWT_TOPIC = 'SQUiXL/LWT'  
+# boot profile is published here once the home screen is up
+BOOT_TOPIC = 'SQUiXL/Boot'
 mqtt.config['will'] = (LWT_TOPIC, 'Goodbye cruel world!', False, 0)
 
 # configure for Event based interface (instead of callbacks)